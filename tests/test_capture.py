@@ -0,0 +1,287 @@
+"""pcap/pcapng reading, SIP extraction and dialog summaries on synthetic captures."""
+
+import socket
+import struct
+
+import pytest
+
+from voiptest.capture import analyze
+from voiptest.capture.pcap import FragmentReassembler, Packet, iter_packets
+from voiptest.capture.sip import build_dialogs, iter_sip_messages, summarize_dialog
+
+CALLER = "10.0.0.1"
+CALLEE = "10.0.0.2"
+
+
+def sip(start_line, call_id="call-1", cseq="1 INVITE", to_tag="", body=""):
+    headers = [
+        start_line,
+        "Via: SIP/2.0/UDP 10.0.0.1:5060;branch=z9hG4bK1",
+        "From: <sip:1001@lab>;tag=a",
+        f"To: <sip:2002@lab>{to_tag}",
+        f"Call-ID: {call_id}",
+        f"CSeq: {cseq}",
+    ]
+    if body:
+        headers.append("Content-Type: application/sdp")
+    headers.append(f"Content-Length: {len(body)}")
+    return ("\r\n".join(headers) + "\r\n\r\n" + body).encode()
+
+
+def sdp(address, port):
+    return f"v=0\r\no=- 1 1 IN IP4 {address}\r\ns=-\r\nc=IN IP4 {address}\r\nt=0 0\r\n" \
+        f"m=audio {port} RTP/AVP 0\r\n"
+
+
+def udp(sport, dport, payload):
+    return struct.pack("!HHHH", sport, dport, 8 + len(payload), 0) + payload
+
+
+def tcp(sport, dport, seq, payload):
+    return struct.pack("!HHIIBBHHH", sport, dport, seq, 0, 5 << 4, 0x18, 65535, 0, 0) + payload
+
+
+def ipv4(src, dst, protocol, payload, ident=0, offset=0, more=False):
+    flags = (0x2000 if more else 0) | (offset // 8)
+    return struct.pack(
+        "!BBHHHBBH4s4s", 0x45, 0, 20 + len(payload), ident, flags, 64, protocol, 0,
+        socket.inet_aton(src), socket.inet_aton(dst),
+    ) + payload
+
+
+def ipv6(src, dst, next_header, payload):
+    return struct.pack(
+        "!IHBB16s16s", 6 << 28, len(payload), next_header, 64,
+        socket.inet_pton(socket.AF_INET6, src), socket.inet_pton(socket.AF_INET6, dst),
+    ) + payload
+
+
+def ipv6_fragment(next_header, ident, offset, more, payload):
+    return struct.pack("!BBHI", next_header, 0, offset | int(more), ident) + payload
+
+
+def ether(ip_packet, ethertype=0x0800):
+    return b"\x02" * 6 + b"\x04" * 6 + struct.pack("!H", ethertype) + ip_packet
+
+
+def fragments_v4(src, dst, protocol, payload, ident, size=1480):
+    frames = []
+    for offset in range(0, len(payload), size):
+        chunk = payload[offset:offset + size]
+        more = offset + size < len(payload)
+        frames.append(ether(ipv4(src, dst, protocol, chunk, ident, offset, more)))
+    return frames
+
+
+def write_pcap(path, frames):
+    with open(path, "wb") as f:
+        f.write(struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 65535, 1))
+        for timestamp, frame in frames:
+            seconds, micros = int(timestamp), round((timestamp % 1) * 1e6)
+            f.write(struct.pack("<IIII", seconds, micros, len(frame), len(frame)) + frame)
+    return path
+
+
+def write_pcapng(path, frames):
+    def block(block_type, body):
+        body += b"\x00" * (-len(body) % 4)
+        length = 12 + len(body)
+        return struct.pack("<II", block_type, length) + body + struct.pack("<I", length)
+
+    with open(path, "wb") as f:
+        f.write(block(0x0A0D0D0A, struct.pack("<IHHq", 0x1A2B3C4D, 1, 0, -1)))
+        # if_tsresol = 9: nanosecond timestamps
+        options = struct.pack("<HHB3x", 9, 1, 9) + struct.pack("<HH", 0, 0)
+        f.write(block(0x00000001, struct.pack("<HHI", 1, 0, 65535) + options))
+        for timestamp, frame in frames:
+            ticks = round(timestamp * 1e9)
+            header = struct.pack("<IIIII", 0, ticks >> 32, ticks & 0xFFFFFFFF, len(frame),
+                                 len(frame))
+            f.write(block(0x00000006, header + frame))
+    return path
+
+
+def as_tuples(packets):
+    return [
+        (round(p.timestamp, 6), p.transport, p.src, p.sport, p.dst, p.dport, bytes(p.payload))
+        for p in packets
+    ]
+
+
+# --- IP fragments --------------------------------------------------------
+
+
+def test_fragmented_ipv4_invite_is_reassembled(tmp_path):
+    invite = sip("INVITE sip:2002@lab SIP/2.0", body=sdp(CALLER, 40000) + "a=x\r\n" * 600)
+    frames = fragments_v4(CALLER, CALLEE, 17, udp(5060, 5060, invite), ident=7)
+    assert len(frames) == 3
+    # Fragments may arrive out of order
+    frames = [frames[1], frames[0], frames[2]]
+    capture = write_pcap(tmp_path / "frag.pcap", [(1.0 + i / 10, f) for i, f in enumerate(frames)])
+
+    fragments = FragmentReassembler()
+    packets = as_tuples(iter_packets(capture, fragments))
+    assert packets == [(1.2, "udp", CALLER, 5060, CALLEE, 5060, invite)]
+    assert (fragments.reassembled, fragments.incomplete) == (1, 0)
+
+
+def test_incomplete_ipv4_datagram_is_dropped_and_counted(tmp_path):
+    invite = sip("INVITE sip:2002@lab SIP/2.0", body="a=x\r\n" * 600)
+    first, _second, _third = fragments_v4(CALLER, CALLEE, 17, udp(5060, 5060, invite), ident=9)
+    capture = write_pcap(tmp_path / "frag.pcap", [(1.0, first)])
+
+    fragments = FragmentReassembler()
+    assert list(iter_packets(capture, fragments)) == []
+    assert (fragments.reassembled, fragments.incomplete) == (0, 1)
+
+    result = analyze.analyze_capture(capture)
+    assert result["dialogs"] == []
+    assert result["fragments"] == {"reassembled": 0, "incomplete": 1}
+
+
+def test_fragmented_ipv6_datagram_is_reassembled(tmp_path):
+    src, dst = "2001:db8::1", "2001:db8::2"
+    datagram = udp(5060, 5062, sip("OPTIONS sip:2002@lab SIP/2.0", body="a=x\r\n" * 400))
+    split = 1232  # Multiple of 8
+    frames = [
+        ether(ipv6(src, dst, 44, ipv6_fragment(17, 5, 0, True, datagram[:split])), 0x86DD),
+        ether(ipv6(src, dst, 44, ipv6_fragment(17, 5, split, False, datagram[split:])), 0x86DD),
+    ]
+    capture = write_pcap(tmp_path / "frag6.pcap", [(2.0, frames[0]), (2.1, frames[1])])
+
+    packets = as_tuples(iter_packets(capture))
+    assert packets == [(2.1, "udp", src, 5060, dst, 5062, datagram[8:])]
+
+
+def test_fragment_reassembly_is_bounded():
+    fragments = FragmentReassembler(max_pending=2)
+    for ident in range(3):
+        assert fragments.add(("a", "b", 17, ident), 0, True, 17, memoryview(b"x" * 8)) is None
+    assert fragments.dropped == 1
+    assert fragments.incomplete == 3
+
+
+# --- pcap and pcapng -----------------------------------------------------
+
+
+@pytest.mark.parametrize("writer", [write_pcap, write_pcapng], ids=["pcap", "pcapng"])
+def test_reader_decodes_udp_and_tcp(tmp_path, writer):
+    invite = sip("INVITE sip:2002@lab SIP/2.0")
+    frames = [
+        (1.25, ether(ipv4(CALLER, CALLEE, 17, udp(5060, 5060, invite)))),
+        # VLAN-tagged frame
+        (1.5, b"\x02" * 12 + struct.pack("!HHH", 0x8100, 42, 0x0800)
+         + ipv4(CALLEE, CALLER, 6, tcp(5061, 40000, 1000, b"hello"))),
+        # ARP is skipped
+        (1.75, ether(b"\x00" * 28, 0x0806)),
+    ]
+    capture = writer(tmp_path / "capture", frames)
+
+    packets = list(iter_packets(capture))
+    assert as_tuples(packets) == [
+        (1.25, "udp", CALLER, 5060, CALLEE, 5060, invite),
+        (1.5, "tcp", CALLEE, 5061, CALLER, 40000, b"hello"),
+    ]
+    assert packets[1].tcp_seq == 1000
+
+
+def test_reader_rejects_other_files(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_bytes(b"not a capture at all")
+    with pytest.raises(ValueError, match="Not a pcap file"):
+        list(iter_packets(path))
+
+
+# --- TCP stream reassembly -----------------------------------------------
+
+
+def segment(seq, data, timestamp=1.0):
+    return Packet(timestamp, "tcp", CALLER, 5060, CALLEE, 5060, memoryview(data), seq)
+
+
+def start_lines(packets):
+    return [message.start_line for message in iter_sip_messages(packets)]
+
+
+def test_tcp_several_messages_per_segment():
+    data = sip("OPTIONS sip:a@lab SIP/2.0", "c1") + b"\r\n\r\n" + sip("SIP/2.0 200 OK", "c2")
+    assert start_lines([segment(1, data)]) == ["OPTIONS sip:a@lab SIP/2.0", "SIP/2.0 200 OK"]
+
+
+def test_tcp_message_split_across_segments_with_retransmit():
+    message = sip("INVITE sip:2002@lab SIP/2.0", body=sdp(CALLER, 40000))
+    first, second = message[:50], message[50:]
+    packets = [
+        segment(100, first),
+        segment(100, first),  # Retransmission of data already seen
+        segment(120, message[20:70]),  # Overlaps both segments
+        segment(150 + 20, second[20:]),
+    ]
+    # The overlapping retransmit delivered bytes 50..70; the rest follows
+    assert start_lines(packets) == ["INVITE sip:2002@lab SIP/2.0"]
+
+
+def test_tcp_gap_drops_partial_message_and_resynchronizes():
+    lost = sip("INVITE sip:2002@lab SIP/2.0", "c1", body=sdp(CALLER, 40000))
+    following = sip("BYE sip:2002@lab SIP/2.0", "c2", cseq="2 BYE")
+    packets = [
+        segment(1, lost[:40]),
+        # lost[40:] never arrives
+        segment(1 + len(lost), following),
+    ]
+    assert start_lines(packets) == ["BYE sip:2002@lab SIP/2.0"]
+
+
+# --- Dialog summaries ----------------------------------------------------
+
+
+def udp_frame(timestamp, src, dst, payload):
+    return timestamp, ether(ipv4(src, dst, 17, udp(5060, 5060, payload)))
+
+
+def test_summarize_answered_call_with_challenge(tmp_path):
+    tag = ";tag=b"
+    frames = [
+        udp_frame(10.0, CALLER, CALLEE, sip("INVITE sip:2002@lab SIP/2.0")),
+        udp_frame(10.1, CALLEE, CALLER, sip("SIP/2.0 401 Unauthorized", to_tag=tag)),
+        udp_frame(10.2, CALLER, CALLEE, sip("INVITE sip:2002@lab SIP/2.0", cseq="2 INVITE")),
+        udp_frame(10.3, CALLEE, CALLER, sip("SIP/2.0 180 Ringing", cseq="2 INVITE", to_tag=tag)),
+        udp_frame(11.0, CALLEE, CALLER, sip("SIP/2.0 200 OK", cseq="2 INVITE", to_tag=tag)),
+        udp_frame(11.1, CALLER, CALLEE, sip("ACK sip:2002@lab SIP/2.0", cseq="2 ACK")),
+        # A re-INVITE failing after the answer does not change the outcome
+        udp_frame(12.0, CALLER, CALLEE, sip("INVITE sip:2002@lab SIP/2.0", cseq="3 INVITE")),
+        udp_frame(12.1, CALLEE, CALLER, sip("SIP/2.0 488 Not Acceptable", cseq="3 INVITE")),
+        udp_frame(14.0, CALLER, CALLEE, sip("BYE sip:2002@lab SIP/2.0", cseq="4 BYE")),
+        udp_frame(14.1, CALLEE, CALLER, sip("SIP/2.0 200 OK", cseq="4 BYE", to_tag=tag)),
+    ]
+    capture = write_pcap(tmp_path / "call.pcap", frames)
+
+    (dialog,) = analyze.load_dialogs(capture)
+    summary = summarize_dialog(dialog)
+    assert summary["method"] == "INVITE"
+    assert (summary["from_user"], summary["to_user"]) == ("1001", "2002")
+    assert summary["messages"] == 10
+    assert (summary["final_sip_code"], summary["outcome"]) == (200, "answered")
+    assert summary["ring_time_s"] == pytest.approx(0.3)
+    assert summary["answer_time_s"] == pytest.approx(1.0)
+    assert summary["call_duration_s"] == pytest.approx(3.0)
+    assert summary["duration_s"] == pytest.approx(4.1)
+
+
+@pytest.mark.parametrize(
+    "code, outcome", [(486, "busy"), (404, "failed"), (None, "no_answer")]
+)
+def test_summarize_unanswered_calls(code, outcome):
+    messages = [sip("INVITE sip:2002@lab SIP/2.0"), sip("SIP/2.0 100 Trying")]
+    if code is not None:
+        messages.append(sip(f"SIP/2.0 {code} Reason", to_tag=";tag=b"))
+    packets = [
+        Packet(1.0 + i, "udp", CALLER, 5060, CALLEE, 5060, memoryview(data))
+        for i, data in enumerate(messages)
+    ]
+
+    (dialog,) = build_dialogs(iter_sip_messages(packets))
+    summary = summarize_dialog(dialog)
+    assert (summary["final_sip_code"], summary["outcome"]) == (code, outcome)
+    assert summary["answer_time_s"] is None
+    assert summary["call_duration_s"] is None
@@ -0,0 +1,98 @@
+"""Worker protocol limits and coordinator retries."""
+
+import socket
+import socketserver
+import threading
+
+import pytest
+
+from voiptest import distributed
+from voiptest.config import VoipTestConfig
+
+
+def make_case(name="case", **overrides):
+    return VoipTestConfig(
+        name=name,
+        target={"host": "127.0.0.1"},
+        call={"from": "caller", "to": "2000"},
+        expect={"outcome": "answered"},
+        **overrides,
+    )
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(server):
+        servers.append(server)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return "127.0.0.1:%d" % server.server_address[1]
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_oversized_frame_is_rejected_before_reading_it():
+    left, right = socket.socketpair()
+    with left, right:
+        left.sendall(distributed.FRAME_HEADER.pack(1 << 31))
+        with pytest.raises(ValueError, match="exceeds"):
+            distributed.recv_message(right)
+
+
+def test_worker_closes_oversized_frame_before_hello(serve):
+    address = serve(distributed.WorkerServer("secret", port=0))
+    host, port = distributed.parse_worker_address(address)
+    with socket.create_connection((host, port), timeout=5) as sock:
+        sock.sendall(distributed.FRAME_HEADER.pack(distributed.HELLO_FRAME_BYTES + 1))
+        assert sock.recv(1) == b""
+
+
+class _FlakyHandler(socketserver.BaseRequestHandler):
+    """Accept the hello, then drop the first run request of the server."""
+
+    def handle(self):
+        while True:
+            request = distributed.recv_message(self.request)
+            if request is None:
+                return
+            if request["op"] == "run":
+                with self.server.lock:
+                    self.server.runs += 1
+                    drop = self.server.runs == 1
+                if drop:
+                    return
+                result = {"name": request["case"]["name"], "passed": True, "actual": {}}
+                distributed.send_message(self.request, {"ok": True, "result": result})
+            else:
+                distributed.send_message(self.request, {"ok": True})
+
+
+def test_case_is_retried_on_another_slot_of_the_same_worker(serve):
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _FlakyHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.runs = 0
+    address = serve(server)
+
+    results, metrics = distributed.run_cases([make_case()], [address], slots_per_worker=2)
+    assert results[0]["passed"] is True
+    assert results[0]["worker"] == address
+    assert server.runs == 2
+
+
+def test_local_payload_errors_are_not_requeued(serve, tmp_path):
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _FlakyHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.runs = 1  # never drop
+    address = serve(server)
+
+    missing = make_case("missing-pool", pools={"callers": {"csv": str(tmp_path / "missing.csv")}})
+    results, _metrics = distributed.run_cases([missing, make_case("ok")], [address])
+    assert results[0]["error"].startswith("Invalid case:")
+    assert results[1]["passed"] is True
+    assert server.runs == 2
@@ -0,0 +1,105 @@
+"""Call flow compilation, scenario rendering and the scenario cache."""
+
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from voiptest import flow
+from voiptest.config import VoipTestConfig
+from voiptest.engines import sipp_flow
+
+
+def make_config(steps):
+    return VoipTestConfig(
+        name="flow",
+        target={"host": "127.0.0.1"},
+        call={"from": "caller", "to": "2002"},
+        expect={"outcome": "answered"},
+        flow=steps,
+    )
+
+
+@pytest.fixture(autouse=True)
+def scenario_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.setattr(sipp_flow, "_memo", {})
+    return tmp_path / "cache" / "voiptest" / "scenarios"
+
+
+def steps_of(root):
+    """(tag, key attribute) for each scenario element, e.g. ("recv", "NOTIFY")."""
+    result = []
+    for element in root:
+        if element.tag == "send":
+            text = element.text.strip()
+            result.append(("send", text.split(None, 2)[1 if text.startswith("SIP/") else 0]))
+        elif element.tag == "recv":
+            result.append(("recv", element.get("request") or element.get("response")))
+        elif element.tag == "label":
+            result.append(("label", element.get("id")))
+    return result
+
+
+def test_compile_and_render_transfer_flow():
+    config = make_config([{"talk": 1.5}, {"dtmf": "1#"}, {"transfer": 2001}])
+    compiled = flow.compile_flow(config)
+
+    root = ET.fromstring(sipp_flow.render_scenario(compiled))
+    assert root.tag == "scenario"
+    assert steps_of(root) == [
+        ("send", "INVITE"), ("recv", "401"), ("send", "ACK"),
+        ("send", "INVITE"), ("recv", "100"), ("recv", "180"), ("recv", "183"), ("recv", "200"),
+        ("send", "ACK"),
+        ("send", "INFO"), ("recv", "200"), ("send", "INFO"), ("recv", "200"),
+        ("send", "REFER"), ("recv", "202"),
+        ("recv", "NOTIFY"), ("send", "200"), ("recv", "NOTIFY"), ("send", "200"),
+        # The far end's BYE is answered; without it voiptest hangs up itself
+        ("recv", "BYE"), ("send", "200"), ("label", "1"),
+        ("send", "BYE"), ("recv", "200"), ("label", "2"),
+    ]
+    pause = root.find("pause")
+    assert pause.get("milliseconds") == "1500"
+    bye = root.findall("recv")[-2]
+    assert (bye.get("request"), bye.get("ontimeout")) == ("BYE", "1")
+    assert "Refer-To: <sip:2001@[field2]>" in root.findall("send")[-5].text
+
+
+def test_wait_for_bye_ends_the_call_without_our_bye():
+    compiled = flow.compile_flow(make_config([{"wait": "bye"}]))
+    assert compiled.operations[-2:] == (
+        flow.ExpectRequest("BYE", timeout_ms=30000),
+        flow.SendResponse(200, "OK"),
+    )
+
+
+def test_flow_validation():
+    with pytest.raises(ValueError, match="must be the last flow step"):
+        make_config([{"transfer": "2001"}, {"talk": 1}])
+    with pytest.raises(ValueError, match="request"):
+        make_config([{"wait": "INVITE"}])
+
+
+def test_scenario_cache_is_reused_for_the_same_flow(scenario_cache, monkeypatch):
+    compiled = flow.compile_flow(make_config([{"talk": 2}, {"hold": 1}]))
+    path = sipp_flow.scenario_file(compiled)
+    assert path.parent == scenario_cache
+    assert path.name == f"{sipp_flow.scenario_key(compiled)}.xml"
+    ET.parse(path)
+
+    # An equal flow compiled again hits the disk cache without rendering
+    monkeypatch.setattr(sipp_flow, "_memo", {})
+    monkeypatch.setattr(sipp_flow, "render_scenario", pytest.fail)
+    again = flow.compile_flow(make_config([{"talk": 2}, {"hold": 1}]))
+    assert again == compiled and again is not compiled
+    assert sipp_flow.scenario_file(again) == path
+
+
+def test_scenario_cache_key_follows_flow_and_renderer(monkeypatch):
+    first = flow.compile_flow(make_config([{"talk": 2}]))
+    second = flow.compile_flow(make_config([{"talk": 3}]))
+    assert sipp_flow.scenario_key(first) != sipp_flow.scenario_key(second)
+    assert sipp_flow.scenario_file(first) != sipp_flow.scenario_file(second)
+
+    key = sipp_flow.scenario_key(first)
+    monkeypatch.setattr(sipp_flow, "RENDERER_VERSION", sipp_flow.RENDERER_VERSION + 1)
+    assert sipp_flow.scenario_key(first) != key
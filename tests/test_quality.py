@@ -0,0 +1,133 @@
+"""Vectorized RTP metrics against a straightforward per-packet reference."""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from voiptest.media.quality import (  # noqa: E402
+    JITTER_GAIN,
+    analyze_stream,
+    estimate_mos,
+    rfc3550_jitter,
+    unwrap,
+)
+
+PACKETS = 5000
+
+
+def reference_unwrap(values, bits):
+    span = 1 << bits
+    half = span >> 1
+    extended = [int(values[0])]
+    for previous, value in zip(values[:-1], values[1:]):
+        step = (int(value) - int(previous)) % span
+        if step > half:
+            step -= span
+        extended.append(extended[-1] + step)
+    return extended
+
+
+def reference_jitter(transit):
+    # RFC 3550 section 6.4.1: J += (|D(i-1,i)| - J) / 16
+    jitter = 0.0
+    out = []
+    for previous, current in zip(transit[:-1], transit[1:]):
+        jitter += (abs(current - previous) - jitter) * JITTER_GAIN
+        out.append(jitter)
+    return out
+
+
+@pytest.fixture
+def stream():
+    """20 ms G.711 stream whose sequence numbers and timestamps both wrap."""
+    rng = np.random.default_rng(3550)
+    index = np.arange(PACKETS, dtype=np.int64)
+    # Swap a few neighbouring packets, including one pair across the wrap
+    order = index.copy()
+    for i in list(rng.choice(PACKETS - 1, size=50, replace=False)) + [535]:
+        order[i], order[i + 1] = order[i + 1], order[i]
+
+    seq = (65000 + order) % (1 << 16)
+    timestamp = ((1 << 32) - 160 * 1000 + 160 * order) % (1 << 32)
+    arrival = 160 * order + rng.exponential(40.0, PACKETS)
+    return order, seq.astype(np.uint16), timestamp.astype(np.uint32), arrival
+
+
+def test_unwrap_sequence_matches_reference(stream):
+    order, seq, _timestamp, _arrival = stream
+    extended = unwrap(seq, 16)
+    assert extended.tolist() == reference_unwrap(seq, 16)
+    assert extended.tolist() == (65000 + order).tolist()
+
+
+def test_unwrap_timestamp_matches_reference(stream):
+    order, _seq, timestamp, _arrival = stream
+    extended = unwrap(timestamp, 32)
+    assert extended.tolist() == reference_unwrap(timestamp, 32)
+    assert (extended - extended[0]).tolist() == (160 * (order - order[0])).tolist()
+
+
+def test_unwrap_empty():
+    assert unwrap(np.array([], dtype=np.uint16), 16).size == 0
+
+
+def test_jitter_matches_reference(stream):
+    _order, _seq, timestamp, arrival = stream
+    transit = arrival - unwrap(timestamp, 32)
+    expected = reference_jitter(transit.tolist())
+    assert rfc3550_jitter(transit) == pytest.approx(expected, rel=1e-9, abs=1e-9)
+
+
+def test_jitter_of_constant_transit_is_zero():
+    assert rfc3550_jitter(np.full(PACKETS, 1234.0)).max() == 0.0
+
+
+def test_analyze_stream_counts_across_sequence_wrap():
+    # 20 packets, sequence numbers 65530..65535, 0..13; timestamps wrap too
+    sent = list(range(20))
+    sent.remove(3)
+    sent.remove(12)  # Two lost
+    arrival_order = []
+    for n in sent:
+        arrival_order.append(n)
+        if n == 10:
+            arrival_order.append(10)  # One duplicate
+    # 65535 arrives after 0: one packet reordered across the wrap
+    i = arrival_order.index(5)
+    arrival_order[i], arrival_order[i + 1] = arrival_order[i + 1], arrival_order[i]
+
+    order = np.array(arrival_order)
+    seq = ((65530 + order) % (1 << 16)).astype(np.uint16)
+    timestamp = (((1 << 32) - 160 * 10 + 160 * order) % (1 << 32)).astype(np.uint32)
+    arrival = order * 0.02  # Constant transit time
+    stats = analyze_stream(seq, timestamp, arrival, 8000)
+
+    assert stats == {
+        "received": 19,
+        "expected": 20,
+        "lost": 2,
+        "duplicates": 1,
+        "reordered": 1,
+        "loss_pct": 10.0,
+        "reorder_pct": 5.263,
+        "jitter_ms": 0.0,
+        "max_jitter_ms": 0.0,
+        "duration_s": 0.38,
+    }
+
+
+@pytest.mark.parametrize(
+    "loss_pct, jitter_ms, latency_ms, mos",
+    [
+        # R = 93.2 - 0.024 * 10 = 92.96
+        (0.0, 0.0, 0.0, 4.40),
+        # R = 93.2 - 0.024 * 50 - 95 * 2 / 27.1 = 84.99
+        (2.0, 20.0, 0.0, 4.20),
+        # Delay 310 ms: R = 93.2 - (0.024 * 310 + 0.11 * (310 - 177.3)) = 71.16
+        (0.0, 0.0, 300.0, 3.65),
+        # R below zero is clamped
+        (0.0, 0.0, 2000.0, 1.0),
+    ],
+)
+def test_estimate_mos_known_values(loss_pct, jitter_ms, latency_ms, mos):
+    assert estimate_mos(loss_pct, jitter_ms, latency_ms) == mos
@@ -0,0 +1,150 @@
+"""SIPp command lines and injection files built for call and register tests."""
+
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from voiptest.config import VoipTestConfig
+from voiptest.engines import sipp
+
+
+def make_config(**overrides):
+    data = {
+        "name": "pool-call",
+        "target": {"host": "127.0.0.1", "domain": "lab"},
+        "accounts": {"caller": {"username": "1000", "password": "secret"}},
+        "call": {"from": "caller", "to": "2000"},
+        "expect": {"outcome": "answered"},
+    }
+    data.update(overrides)
+    return VoipTestConfig(**data)
+
+
+def pool(mode):
+    return {"generate": {"start": 100, "count": 3, "password": "pw{n}"}, "mode": mode}
+
+
+def pool_call(mode):
+    return make_config(pools={"callers": pool(mode)}, call={"from": "callers", "to": "2000"})
+
+
+@pytest.fixture
+def sipp_calls(monkeypatch):
+    """Record SIPp command lines (with their injection file) instead of running SIPp."""
+    calls = []
+
+    def fake_run_process(cmd, cwd, timeout):
+        csv_path = Path(cmd[cmd.index("-inf") + 1])
+        calls.append((cmd, csv_path.read_text().splitlines(), timeout))
+        return subprocess.CompletedProcess(cmd, 0, "", "")
+
+    monkeypatch.setattr(sipp, "run_process", fake_run_process)
+    return calls
+
+
+def option(cmd, name):
+    return cmd[cmd.index(name) + 1] if name in cmd else None
+
+
+def test_single_caller(sipp_calls):
+    sipp.run_sipp(make_config())
+    cmd, rows, _timeout = sipp_calls[0]
+    assert rows == ["SEQUENTIAL", "2000;1000;lab;secret"]
+    assert (option(cmd, "-m"), option(cmd, "-l"), option(cmd, "-r")) == ("1", "1", "1")
+    assert option(cmd, "-timeout") == "30"
+    assert option(cmd, "-au") == "1000"
+    assert "-users" not in cmd
+
+
+@pytest.mark.parametrize("mode", ["SEQUENTIAL", "RANDOM"])
+def test_pool_calls_in_series(sipp_calls, mode):
+    sipp.run_sipp(pool_call(mode))
+    cmd, rows, _timeout = sipp_calls[0]
+    assert rows == [mode, "2000;100;lab;pw100", "2000;101;lab;pw101", "2000;102;lab;pw102"]
+    assert (option(cmd, "-m"), option(cmd, "-l"), option(cmd, "-r")) == ("3", "1", "1")
+    # One call setup timeout per call placed in series
+    assert option(cmd, "-timeout") == "90"
+    assert "-users" not in cmd
+    assert "-au" not in cmd
+
+
+def test_pool_user_mode(sipp_calls):
+    sipp.run_sipp(pool_call("USER"))
+    cmd, rows, _timeout = sipp_calls[0]
+    assert rows[0] == "USER"
+    assert len(rows) == 4
+    assert (option(cmd, "-m"), option(cmd, "-users")) == ("3", "3")
+    assert "-l" not in cmd and "-r" not in cmd
+    assert option(cmd, "-timeout") == "30"
+
+
+def test_empty_pool_is_not_run(sipp_calls, tmp_path):
+    empty = tmp_path / "empty.csv"
+    empty.write_text("username;password\n")
+    result = sipp.run_sipp(
+        make_config(pools={"callers": {"csv": str(empty)}}, call={"from": "callers", "to": "2000"})
+    )
+    assert result["reason"] == "Account pool is empty: callers"
+    assert sipp_calls == []
+
+
+def test_register_csv(tmp_path):
+    config = make_config(
+        type="register",
+        call=None,
+        pools={"extensions": pool("RANDOM")},
+        register={"pool": "extensions", "expires": 60},
+        expect={},
+    )
+    csv_path = tmp_path / "accounts.csv"
+    assert sipp.generate_register_csv_file(csv_path, config) == 3
+    assert csv_path.read_text().splitlines() == [
+        "RANDOM", "100;lab;pw100;60", "101;lab;pw101;60", "102;lab;pw102;60",
+    ]
+
+
+def test_register_rejects_user_pool():
+    with pytest.raises(ValueError, match="not USER"):
+        make_config(
+            type="register",
+            call=None,
+            pools={"extensions": pool("USER")},
+            register={"pool": "extensions"},
+            expect={},
+        )
+
+
+def test_pool_final_code_reports_first_failure():
+    def call(call_id, code):
+        return (
+            f"----------------------------------------------- 2026-01-01 00:00:00.000000\n"
+            f"UDP message received [0] bytes :\n\n"
+            f"SIP/2.0 {code} Reason\nCall-ID: {call_id}\nCSeq: 2 INVITE\n"
+            f"From: <sip:a@lab>;tag=1\nTo: <sip:b@lab>;tag=2\n\n"
+        )
+
+    log = call("a", 200) + call("b", 486) + call("c", 200)
+    assert sipp.extract_final_sip_code(log) == 200
+    assert sipp.extract_pool_final_code(log) == 486
+
+
+def test_capture_is_limited_to_the_case_ports(sipp_calls, monkeypatch, tmp_path):
+    captures = []
+
+    def fake_start_capture(config, capture_file, sip_port, media_port=None, rtp_port=None):
+        captures.append(sipp.capture_filter_for(config, sip_port, media_port, rtp_port))
+        return None
+
+    monkeypatch.setattr(sipp, "start_capture", fake_start_capture)
+    sipp.run_sipp(make_config(), capture_file=tmp_path / "case.pcap")
+    cmd, _rows, _timeout = sipp_calls[0]
+    sip_port, media_port = int(option(cmd, "-p")), int(option(cmd, "-mp"))
+    assert captures == [
+        f"(host 127.0.0.1 and port {sip_port})"
+        f" or (udp and portrange {media_port}-{media_port + 3})"
+    ]
+    config = make_config()
+    assert sipp.capture_filter_for(config, 5070, rtp_port=41000) == (
+        "(host 127.0.0.1 and port 5070) or (udp and port 41000)"
+    )
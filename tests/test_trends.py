@@ -0,0 +1,42 @@
+"""Significance tests used for regression detection."""
+
+import pytest
+
+from voiptest.trends import fisher_less, mann_whitney_greater, percentile
+
+
+def test_mann_whitney_separated_samples():
+    # U = 9, mean 4.5, variance 9 * 7 / 12 = 5.25, z = (9 - 4.5 - 0.5) / sqrt(5.25)
+    assert mann_whitney_greater([4, 5, 6], [1, 2, 3]) == pytest.approx(0.0404278, abs=1e-6)
+    assert mann_whitney_greater([1, 2, 3], [4, 5, 6]) == pytest.approx(0.9854518, abs=1e-6)
+
+
+def test_mann_whitney_with_ties():
+    # Ties at 3 (2) and 4 (3): U = 13.5, variance 16 / 12 * (9 - 30 / 56)
+    p = mann_whitney_greater([3, 4, 4, 5], [1, 2, 3, 4])
+    assert p == pytest.approx(0.0683291, abs=1e-6)
+
+
+def test_mann_whitney_all_tied():
+    assert mann_whitney_greater([2, 2, 2], [2, 2, 2]) == 1.0
+
+
+def test_fisher_lady_tasting_tea():
+    # P(X <= 1) for 4 of 8 hits in a sample of 4: (1 + 16) / 70
+    assert fisher_less(1, 4, 3, 4) == pytest.approx(17 / 70)
+
+
+def test_fisher_tails():
+    assert fisher_less(0, 5, 5, 5) == pytest.approx(1 / 252)
+    assert fisher_less(5, 5, 5, 5) == 1.0
+    assert fisher_less(3, 4, 1, 4) == pytest.approx(69 / 70)
+
+
+def test_percentile_nearest_rank():
+    samples = [15, 20, 35, 40, 50]
+    assert percentile(samples, 5) == 15
+    assert percentile(samples, 30) == 20
+    assert percentile(samples, 40) == 20
+    assert percentile(samples, 50) == 35
+    assert percentile(list(reversed(samples)), 100) == 50
+    assert percentile([], 50) is None
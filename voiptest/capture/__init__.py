@@ -0,0 +1 @@
+"""Packet capture ingestion and offline SIP analysis."""
@@ -0,0 +1,204 @@
+"""Offline analysis of pcap files against ``Expect`` rules.
+
+Results use the same shape as ``runner.run_test_file`` so they can be
+reported (console, JUnit) exactly like live runs. RTP in the capture is
+matched to dialogs through the audio endpoints their SDP advertises, so
+media expectations apply offline too.
+"""
+
+import ipaddress
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from voiptest.capture.pcap import FragmentReassembler, Packet, iter_packets
+from voiptest.capture.sip import (
+    SIP_PREFIXES,
+    Dialog,
+    build_dialogs,
+    iter_sip_messages,
+    sdp_audio_endpoint,
+    summarize_dialog,
+)
+from voiptest.config import VoipTestConfig
+from voiptest.expectations import check_expectations
+from voiptest.media.rtp import RtpPackets, parse_rtp_header
+
+Endpoint = Tuple[str, int]
+
+
+def _collect_rtp(
+    packets: Iterable[Packet], streams: Dict[Endpoint, RtpPackets]
+) -> Iterator[Packet]:
+    """Pass packets through, recording RTP headers by destination endpoint."""
+    for packet in packets:
+        payload = packet.payload
+        if packet.transport == "udp" and payload and not bytes(payload[:10]).startswith(
+            SIP_PREFIXES
+        ):
+            header = parse_rtp_header(payload)
+            if header is not None:
+                key = (str(ipaddress.ip_address(packet.dst)), packet.dport)
+                streams.setdefault(key, RtpPackets()).append(header, packet.timestamp)
+                continue
+        yield packet
+
+
+def load_capture(
+    pcap_path: Path, fragments: Optional[FragmentReassembler] = None
+) -> Tuple[List[Dialog], Dict[Endpoint, RtpPackets]]:
+    """Read a capture file in one pass: SIP dialogs and RTP packets.
+
+    Args:
+        pcap_path: pcap or pcapng file
+        fragments: Reassembler for fragmented datagrams, to read its
+                   counters afterwards
+
+    Returns:
+        Tuple of (dialogs ordered by their first message, RTP packets keyed
+        by destination (address, port))
+    """
+    streams: Dict[Endpoint, RtpPackets] = {}
+    packets = iter_packets(pcap_path, fragments)
+    dialogs = build_dialogs(iter_sip_messages(_collect_rtp(packets, streams)))
+    return dialogs, streams
+
+
+def load_dialogs(pcap_path: Path) -> List[Dialog]:
+    """Read a capture file and reassemble its SIP dialogs.
+
+    Args:
+        pcap_path: pcap or pcapng file
+
+    Returns:
+        Dialogs ordered by their first message
+    """
+    return load_capture(pcap_path)[0]
+
+
+def dialog_media(
+    dialog: Dialog, streams: Dict[Endpoint, RtpPackets], clock_rate: int = 8000
+) -> Optional[Dict[str, Any]]:
+    """Compute media quality for the RTP sent to a dialog's SDP endpoints.
+
+    Streams in both directions are analyzed; like live runs, the figures
+    are the worst case across streams.
+
+    Args:
+        dialog: Dialog whose SDP offers/answers name the audio endpoints
+        streams: RTP packets by destination endpoint (see load_capture)
+        clock_rate: RTP clock rate in Hz
+
+    Returns:
+        Media quality dictionary, or None if no RTP reached the endpoints
+    """
+    endpoints = []
+    for message in dialog.messages:
+        endpoint = sdp_audio_endpoint(message)
+        if endpoint is not None and endpoint not in endpoints:
+            endpoints.append(endpoint)
+
+    merged = RtpPackets()
+    for endpoint in endpoints:
+        packets = streams.get(endpoint)
+        if packets is None:
+            continue
+        merged.seq.extend(packets.seq)
+        merged.timestamp.extend(packets.timestamp)
+        merged.ssrc.extend(packets.ssrc)
+        merged.payload_type.extend(packets.payload_type)
+        merged.arrival_s.extend(packets.arrival_s)
+
+    if len(merged) == 0:
+        return None
+
+    # NumPy is only needed when the capture has media
+    from voiptest.media import quality
+
+    return quality.analyze_packets(merged, clock_rate)
+
+
+def analyze_capture(pcap_path: Path, config: Optional[VoipTestConfig] = None) -> Dict[str, Any]:
+    """Analyze the SIP dialogs in a capture file.
+
+    Every INVITE dialog becomes a run. Without a config each run only
+    reports what happened; with a config its ``expect`` section is
+    evaluated against each dialog.
+
+    Args:
+        pcap_path: pcap or pcapng file
+        config: Optional test configuration whose expectations to apply
+
+    Returns:
+        Dictionary with aggregated results:
+        {
+            "name": str,
+            "passed": bool,
+            "runs": List[Dict],
+            "dialogs": List[Dict],  # summaries of all dialogs, any method
+            "fragments": {"reassembled": int, "incomplete": int}
+        }
+    """
+    fragments = FragmentReassembler()
+    dialogs, streams = load_capture(pcap_path, fragments)
+    clock_rate = config.media.clock_rate if config is not None and config.media else 8000
+    summaries = [summarize_dialog(dialog) for dialog in dialogs]
+
+    runs = []
+    for dialog, summary in zip(dialogs, summaries):
+        if summary["method"] != "INVITE":
+            continue
+
+        actual = {
+            "outcome": summary["outcome"],
+            "sip_code": summary["final_sip_code"],
+            "answer_time_s": summary["answer_time_s"],
+            "call_duration_s": summary["call_duration_s"],
+            "duration_s": summary["duration_s"],
+        }
+        media = dialog_media(dialog, streams, clock_rate)
+        if media is not None:
+            actual["media"] = media
+        run = {
+            "name": f"{summary['call_id']} (to={summary['to_user']})",
+            "passed": True,
+            "actual": actual,
+            "duration_s": summary["duration_s"],
+            "ladder": format_ladder(dialog),
+        }
+        if config is not None:
+            run["config"] = {"expect": config.expect.model_dump()}
+            run["passed"] = check_expectations(config.expect, actual)
+            if media is None and _has_media_limits(config):
+                run["error"] = "No RTP to this dialog's SDP endpoints in the capture"
+        runs.append(run)
+
+    return {
+        "name": Path(pcap_path).name,
+        "passed": all(run["passed"] for run in runs),
+        "runs": runs,
+        "dialogs": summaries,
+        "fragments": {"reassembled": fragments.reassembled, "incomplete": fragments.incomplete},
+    }
+
+
+def _has_media_limits(config: VoipTestConfig) -> bool:
+    expect = config.expect
+    limits = (expect.max_jitter_ms, expect.max_loss_pct, expect.max_reorder_pct, expect.min_mos)
+    return any(limit is not None for limit in limits)
+
+
+def format_ladder(dialog: Dialog) -> str:
+    """Render a dialog as a text ladder with offsets from its first message.
+
+    Args:
+        dialog: Dialog to render
+
+    Returns:
+        One line per message: offset, direction and start line
+    """
+    start = dialog.messages[0].timestamp
+    lines = []
+    for message in dialog.messages:
+        direction = f"{message.src} -> {message.dst}" if message.src else ""
+        lines.append(f"+{message.timestamp - start:8.3f}s  {direction:<45} {message.start_line}")
+    return "\n".join(lines)
@@ -0,0 +1,445 @@
+"""Zero-copy pcap/pcapng reader.
+
+The capture file is memory-mapped and packets are handed out as
+``memoryview`` slices of the map, so headers are decoded in place and
+payload bytes are only copied by consumers that need them (e.g. the SIP
+parser). Supported link types cover what tcpdump and Wireshark produce
+on common VoIP hosts: Ethernet (with VLAN tags), Linux cooked capture
+v1/v2, BSD loopback and raw IP.
+
+Fragmented IPv4/IPv6 datagrams (e.g. large SIP INVITEs over UDP) are
+reassembled by a ``FragmentReassembler``; reassembled payloads are copies
+rather than views. Datagrams with fragments missing are dropped and
+counted.
+"""
+
+import mmap
+import socket
+import struct
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterator, NamedTuple, Optional, Tuple
+
+# pcap global header magics (file byte order is detected from these)
+PCAP_MAGIC_US = 0xA1B2C3D4
+PCAP_MAGIC_NS = 0xA1B23C4D
+
+# pcapng block types
+PCAPNG_SHB = 0x0A0D0D0A
+PCAPNG_IDB = 0x00000001
+PCAPNG_SPB = 0x00000003
+PCAPNG_EPB = 0x00000006
+PCAPNG_BYTE_ORDER_MAGIC = 0x1A2B3C4D
+
+# Link-layer header types
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV4 = 228
+LINKTYPE_IPV6 = 229
+LINKTYPE_LINUX_SLL2 = 276
+
+ETHERTYPE_IPV4 = 0x0800
+ETHERTYPE_IPV6 = 0x86DD
+ETHERTYPE_VLAN = (0x8100, 0x88A8, 0x9100)
+
+IPPROTO_TCP = 6
+IPPROTO_UDP = 17
+
+# IPv6 extension headers skipped on the way to the transport header
+IPV6_EXTENSION_HEADERS = (0, 43, 60)
+IPV6_FRAGMENT = 44
+
+IPV4_MORE_FRAGMENTS = 0x2000
+IPV4_FRAGMENT_OFFSET = 0x1FFF
+
+# Datagrams being reassembled at once; the oldest is dropped beyond this
+MAX_PENDING_DATAGRAMS = 1024
+
+
+class Packet(NamedTuple):
+    """A decoded UDP or TCP packet.
+
+    ``payload`` is a view into the memory-mapped capture and is only valid
+    while the reader is being iterated.
+    """
+
+    timestamp: float
+    transport: str  # "udp" or "tcp"
+    src: str
+    sport: int
+    dst: str
+    dport: int
+    payload: memoryview
+    tcp_seq: Optional[int] = None
+
+
+class _Datagram:
+    """Fragments received so far for one IP datagram."""
+
+    __slots__ = ("protocol", "parts", "total")
+
+    def __init__(self) -> None:
+        self.protocol: Optional[int] = None
+        self.parts: Dict[int, bytes] = {}
+        self.total: Optional[int] = None
+
+    def payload(self) -> Optional[bytes]:
+        """Return the whole payload once every byte has arrived."""
+        if self.total is None or self.protocol is None:
+            return None
+        position = 0
+        chunks = []
+        for offset in sorted(self.parts):
+            if offset > position:
+                return None  # Hole
+            chunk = self.parts[offset][position - offset:]
+            chunks.append(chunk)
+            position += len(chunk)
+        if position < self.total:
+            return None
+        return b"".join(chunks)[:self.total]
+
+
+class FragmentReassembler:
+    """Reassemble fragmented IP datagrams across the packets of a capture.
+
+    Attributes:
+        reassembled: Datagrams completed so far
+        dropped: Datagrams given up on (see ``incomplete`` for those still
+                 waiting when the capture ends)
+    """
+
+    def __init__(self, max_pending: int = MAX_PENDING_DATAGRAMS) -> None:
+        self.max_pending = max_pending
+        self.reassembled = 0
+        self.dropped = 0
+        self._pending: "OrderedDict[Tuple, _Datagram]" = OrderedDict()
+
+    @property
+    def incomplete(self) -> int:
+        """Datagrams that never got all their fragments."""
+        return self.dropped + len(self._pending)
+
+    def add(
+        self, key: Tuple, offset: int, more: bool, protocol: Optional[int], data: memoryview
+    ) -> Optional[Tuple[int, bytes]]:
+        """Add one fragment.
+
+        Args:
+            key: Datagram identity (addresses and IP identification)
+            offset: Byte offset of the fragment in the datagram payload
+            more: Whether more fragments follow (MF flag)
+            protocol: Payload protocol (recorded from the first fragment)
+            data: Fragment payload
+
+        Returns:
+            (protocol, payload) once the datagram is complete, else None
+        """
+        datagram = self._pending.get(key)
+        if datagram is None:
+            if len(self._pending) >= self.max_pending:
+                self._pending.popitem(last=False)
+                self.dropped += 1
+            datagram = self._pending[key] = _Datagram()
+
+        datagram.parts[offset] = bytes(data)
+        if protocol is not None and offset == 0:
+            datagram.protocol = protocol
+        if not more:
+            datagram.total = offset + len(data)
+
+        payload = datagram.payload()
+        if payload is None:
+            return None
+        del self._pending[key]
+        self.reassembled += 1
+        return datagram.protocol, payload
+
+
+def iter_packets(
+    path: Path, fragments: Optional[FragmentReassembler] = None
+) -> Iterator[Packet]:
+    """Iterate over the UDP and TCP packets in a pcap or pcapng file.
+
+    Args:
+        path: Capture file path
+        fragments: Reassembler for fragmented datagrams; pass one to read
+                   its counters afterwards (a private one is used otherwise)
+
+    Yields:
+        Packet tuples in capture order
+
+    Raises:
+        ValueError: If the file is not a pcap or pcapng capture
+    """
+    with open(path, "rb") as f:
+        if Path(path).stat().st_size == 0:
+            return
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if fragments is None:
+        fragments = FragmentReassembler()
+
+    view = memoryview(mapped)
+    try:
+        if len(view) < 4:
+            raise ValueError(f"Not a pcap file: {path}")
+
+        magic = struct.unpack_from("<I", view)[0]
+        if magic == PCAPNG_SHB:
+            frames = _iter_pcapng_frames(view)
+        else:
+            frames = _iter_pcap_frames(view, path)
+
+        for timestamp, linktype, frame in frames:
+            packet = decode_frame(timestamp, linktype, frame, fragments)
+            if packet is not None:
+                yield packet
+    finally:
+        view.release()
+        try:
+            mapped.close()
+        except BufferError:
+            # A consumer still holds a payload view; the map is freed with it
+            pass
+
+
+def _iter_pcap_frames(view: memoryview, path: Path) -> Iterator[Tuple[float, int, memoryview]]:
+    """Iterate over (timestamp, linktype, frame) records of a classic pcap file."""
+    for order in ("<", ">"):
+        magic = struct.unpack_from(order + "I", view)[0]
+        if magic in (PCAP_MAGIC_US, PCAP_MAGIC_NS):
+            break
+    else:
+        raise ValueError(f"Not a pcap file: {path}")
+
+    scale = 1e-9 if magic == PCAP_MAGIC_NS else 1e-6
+    linktype = struct.unpack_from(order + "I", view, 20)[0] & 0x0FFFFFFF
+    record = struct.Struct(order + "IIII")
+
+    offset = 24
+    end = len(view)
+    while offset + record.size <= end:
+        ts_sec, ts_frac, incl_len, _orig_len = record.unpack_from(view, offset)
+        offset += record.size
+        if offset + incl_len > end:
+            break  # Truncated capture
+        yield ts_sec + ts_frac * scale, linktype, view[offset:offset + incl_len]
+        offset += incl_len
+
+
+def _iter_pcapng_frames(view: memoryview) -> Iterator[Tuple[float, int, memoryview]]:
+    """Iterate over (timestamp, linktype, frame) records of a pcapng file."""
+    order = "<"
+    interfaces = []  # (linktype, timestamp scale) per interface id
+    offset = 0
+    end = len(view)
+
+    while offset + 12 <= end:
+        block_type = struct.unpack_from(order + "I", view, offset)[0]
+
+        if block_type == PCAPNG_SHB:
+            # Each section restates its byte order and resets interfaces
+            bom = struct.unpack_from("<I", view, offset + 8)[0]
+            order = "<" if bom == PCAPNG_BYTE_ORDER_MAGIC else ">"
+            interfaces = []
+
+        block_len = struct.unpack_from(order + "I", view, offset + 4)[0]
+        if block_len < 12 or offset + block_len > end:
+            break  # Corrupt or truncated block
+        body = view[offset + 8:offset + block_len - 4]
+
+        if block_type == PCAPNG_IDB:
+            linktype = struct.unpack_from(order + "H", body)[0]
+            interfaces.append((linktype, _pcapng_ts_scale(body, order)))
+        elif block_type == PCAPNG_EPB:
+            if_id, ts_high, ts_low, cap_len = struct.unpack_from(order + "IIII", body)
+            if if_id < len(interfaces):
+                linktype, scale = interfaces[if_id]
+                timestamp = ((ts_high << 32) | ts_low) * scale
+                yield timestamp, linktype, body[20:20 + cap_len]
+        elif block_type == PCAPNG_SPB and interfaces:
+            # Simple packets carry no timestamp; snaplen bounds the data
+            orig_len = struct.unpack_from(order + "I", body)[0]
+            linktype = interfaces[0][0]
+            yield 0.0, linktype, body[4:4 + min(orig_len, len(body) - 4)]
+
+        offset += block_len
+
+
+def _pcapng_ts_scale(idb_body: memoryview, order: str) -> float:
+    """Return the timestamp unit of an interface from its if_tsresol option."""
+    offset = 8  # linktype, reserved, snaplen
+    while offset + 4 <= len(idb_body):
+        code, length = struct.unpack_from(order + "HH", idb_body, offset)
+        if code == 0:
+            break
+        if code == 9 and length >= 1:
+            resolution = idb_body[offset + 4]
+            if resolution & 0x80:
+                return 2.0 ** -(resolution & 0x7F)
+            return 10.0 ** -resolution
+        offset += 4 + ((length + 3) & ~3)
+    return 1e-6
+
+
+def decode_frame(
+    timestamp: float,
+    linktype: int,
+    frame: memoryview,
+    fragments: Optional[FragmentReassembler] = None,
+) -> Optional[Packet]:
+    """Decode a link-layer frame down to its UDP/TCP payload.
+
+    Args:
+        timestamp: Capture timestamp in seconds
+        linktype: pcap LINKTYPE_* value
+        frame: Frame bytes
+        fragments: Reassembler for IP fragments; without one every
+                   fragment is dropped
+
+    Returns:
+        Packet, or None for non-IP, non-UDP/TCP or malformed frames and for
+        fragments of datagrams that are not complete yet
+    """
+    if linktype == LINKTYPE_ETHERNET:
+        if len(frame) < 14:
+            return None
+        ethertype = struct.unpack_from("!H", frame, 12)[0]
+        offset = 14
+        while ethertype in ETHERTYPE_VLAN and len(frame) >= offset + 4:
+            ethertype = struct.unpack_from("!H", frame, offset + 2)[0]
+            offset += 4
+    elif linktype == LINKTYPE_LINUX_SLL:
+        if len(frame) < 16:
+            return None
+        ethertype = struct.unpack_from("!H", frame, 14)[0]
+        offset = 16
+    elif linktype == LINKTYPE_LINUX_SLL2:
+        if len(frame) < 20:
+            return None
+        ethertype = struct.unpack_from("!H", frame, 0)[0]
+        offset = 20
+    elif linktype == LINKTYPE_NULL:
+        if len(frame) < 4:
+            return None
+        # Address family in host byte order of the capturing machine
+        family = struct.unpack_from("<I", frame)[0]
+        if family > 0xFFFF:
+            family = struct.unpack_from(">I", frame)[0]
+        ethertype = ETHERTYPE_IPV4 if family == 2 else ETHERTYPE_IPV6
+        offset = 4
+    elif linktype in (LINKTYPE_RAW, LINKTYPE_IPV4, LINKTYPE_IPV6):
+        if len(frame) < 1:
+            return None
+        ethertype = ETHERTYPE_IPV4 if frame[0] >> 4 == 4 else ETHERTYPE_IPV6
+        offset = 0
+    else:
+        return None
+
+    if ethertype == ETHERTYPE_IPV4:
+        return _decode_ipv4(timestamp, frame[offset:], fragments)
+    if ethertype == ETHERTYPE_IPV6:
+        return _decode_ipv6(timestamp, frame[offset:], fragments)
+    return None
+
+
+def _decode_ipv4(
+    timestamp: float, data: memoryview, fragments: Optional[FragmentReassembler]
+) -> Optional[Packet]:
+    if len(data) < 20:
+        return None
+    header_len = (data[0] & 0x0F) * 4
+    total_len = struct.unpack_from("!H", data, 2)[0]
+    flags = struct.unpack_from("!H", data, 6)[0]
+
+    protocol = data[9]
+    src = socket.inet_ntop(socket.AF_INET, data[12:16])
+    dst = socket.inet_ntop(socket.AF_INET, data[16:20])
+    # total_len bounds the packet when Ethernet padding follows it
+    end = min(total_len, len(data)) if total_len else len(data)
+    payload = data[header_len:end]
+
+    more = bool(flags & IPV4_MORE_FRAGMENTS)
+    fragment_offset = (flags & IPV4_FRAGMENT_OFFSET) * 8
+    if more or fragment_offset:
+        if fragments is None:
+            return None
+        ident = struct.unpack_from("!H", data, 4)[0]
+        complete = fragments.add(
+            (src, dst, protocol, ident), fragment_offset, more, protocol, payload
+        )
+        if complete is None:
+            return None
+        payload = memoryview(complete[1])
+
+    return _decode_transport(timestamp, protocol, src, dst, payload)
+
+
+def _decode_ipv6(
+    timestamp: float, data: memoryview, fragments: Optional[FragmentReassembler]
+) -> Optional[Packet]:
+    if len(data) < 40:
+        return None
+    payload_len = struct.unpack_from("!H", data, 4)[0]
+    src = socket.inet_ntop(socket.AF_INET6, data[8:24])
+    dst = socket.inet_ntop(socket.AF_INET6, data[24:40])
+
+    end = min(40 + payload_len, len(data)) if payload_len else len(data)
+    next_header, offset = _skip_ipv6_extensions(data[6], data, 40, end)
+    if next_header is None:
+        return None
+
+    if next_header == IPV6_FRAGMENT:
+        if fragments is None or offset + 8 > end:
+            return None
+        fragment_next = data[offset]
+        field, ident = struct.unpack_from("!HI", data, offset + 2)
+        complete = fragments.add(
+            (src, dst, ident), field & 0xFFF8, bool(field & 1), fragment_next,
+            data[offset + 8:end],
+        )
+        if complete is None:
+            return None
+        # Extension headers after the fragment header are part of the payload
+        data = memoryview(complete[1])
+        next_header, offset = _skip_ipv6_extensions(complete[0], data, 0, len(data))
+        end = len(data)
+        if next_header is None or next_header == IPV6_FRAGMENT:
+            return None
+
+    return _decode_transport(timestamp, next_header, src, dst, data[offset:end])
+
+
+def _skip_ipv6_extensions(
+    next_header: int, data: memoryview, offset: int, end: int
+) -> Tuple[Optional[int], int]:
+    """Skip extension headers up to the transport or fragment header."""
+    while next_header in IPV6_EXTENSION_HEADERS:
+        if offset + 8 > end:
+            return None, offset
+        header_len = (data[offset + 1] + 1) * 8
+        next_header = data[offset]
+        offset += header_len
+    return next_header, offset
+
+
+def _decode_transport(
+    timestamp: float, protocol: int, src: str, dst: str, data: memoryview
+) -> Optional[Packet]:
+    if protocol == IPPROTO_UDP:
+        if len(data) < 8:
+            return None
+        sport, dport = struct.unpack_from("!HH", data)
+        return Packet(timestamp, "udp", src, sport, dst, dport, data[8:])
+
+    if protocol == IPPROTO_TCP:
+        if len(data) < 20:
+            return None
+        sport, dport, seq = struct.unpack_from("!HHI", data)
+        header_len = (data[12] >> 4) * 4
+        return Packet(timestamp, "tcp", src, sport, dst, dport, data[header_len:], seq)
+
+    return None
@@ -0,0 +1,410 @@
+"""SIP message parsing and dialog reassembly.
+
+Messages come either from a pcap (see ``voiptest.capture.pcap``) or from
+a SIPp ``-trace_msg`` message log. They are grouped into dialogs by
+Call-ID, and each dialog is summarized into final code and timings that
+can be checked with the same ``Expect`` rules as live runs.
+"""
+
+import ipaddress
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from voiptest.capture.pcap import Packet
+from voiptest.expectations import outcome_for_sip_code
+
+# Compact header forms (RFC 3261 section 7.3.3)
+COMPACT_HEADERS = {
+    "i": "call-id",
+    "f": "from",
+    "t": "to",
+    "v": "via",
+    "m": "contact",
+    "l": "content-length",
+    "c": "content-type",
+}
+
+REQUEST_LINE = re.compile(r"^([A-Z]+) (\S+) SIP/2\.0$")
+STATUS_LINE = re.compile(r"^SIP/2\.0 (\d{3})(?: (.*))?$")
+URI_USER = re.compile(r"sips?:([^@;>\s]+)@")
+TAG_PARAM = re.compile(r";\s*tag=([^;>\s]+)", re.IGNORECASE)
+SDP_CONNECTION = re.compile(r"^c=IN IP[46] (\S+)", re.MULTILINE)
+SDP_AUDIO = re.compile(r"^m=audio (\d+) ", re.MULTILINE)
+SDP_MEDIA = re.compile(r"^m=", re.MULTILINE)
+
+# SIPp message log entry separator, e.g.
+# "----------------------------------------------- 2024-01-23\t10:12:13.123456"
+SIPP_LOG_SEPARATOR = re.compile(
+    r"^-{10,} (\d{4}-\d{2}-\d{2})\s+(\d{2}):(\d{2}):(\d{2}(?:\.\d+)?)\s*$", re.MULTILINE
+)
+
+# Cheap prefix test before decoding a UDP payload as text
+SIP_PREFIXES = (
+    b"SIP/2.0 ", b"INVITE ", b"ACK ", b"BYE ", b"CANCEL ", b"REGISTER ", b"OPTIONS ",
+    b"PRACK ", b"SUBSCRIBE ", b"NOTIFY ", b"PUBLISH ", b"INFO ", b"REFER ", b"MESSAGE ",
+    b"UPDATE ",
+)
+
+
+@dataclass
+class SipMessage:
+    """A parsed SIP request or response."""
+
+    timestamp: float
+    start_line: str
+    headers: Dict[str, str]
+    src: str = ""
+    dst: str = ""
+    method: Optional[str] = None  # Requests only
+    status: Optional[int] = None  # Responses only
+    request_uri: Optional[str] = None
+    body: str = ""
+
+    @property
+    def is_request(self) -> bool:
+        return self.method is not None
+
+    @property
+    def call_id(self) -> str:
+        return self.headers.get("call-id", "")
+
+    @property
+    def cseq_method(self) -> str:
+        parts = self.headers.get("cseq", "").split()
+        return parts[1].upper() if len(parts) > 1 else ""
+
+    def header_user(self, name: str) -> Optional[str]:
+        """Return the user part of the URI in a From/To header."""
+        match = URI_USER.search(self.headers.get(name, ""))
+        return match.group(1) if match else None
+
+
+@dataclass
+class Dialog:
+    """All messages sharing a Call-ID, in capture order."""
+
+    call_id: str
+    messages: List[SipMessage] = field(default_factory=list)
+
+
+def parse_sip_message(
+    text: str, timestamp: float = 0.0, src: str = "", dst: str = ""
+) -> Optional[SipMessage]:
+    """Parse a single SIP message.
+
+    Args:
+        text: Message text (headers and optional body)
+        timestamp: Time the message was seen, in seconds
+        src: Source address ("ip:port"), if known
+        dst: Destination address ("ip:port"), if known
+
+    Returns:
+        SipMessage, or None if the text is not a SIP message
+    """
+    parts = re.split(r"\r?\n\r?\n", text, maxsplit=1)
+    head = parts[0]
+    lines = head.splitlines()
+    if not lines:
+        return None
+
+    start_line = lines[0].strip()
+    method = status = request_uri = None
+    request = REQUEST_LINE.match(start_line)
+    if request:
+        method, request_uri = request.group(1), request.group(2)
+    else:
+        response = STATUS_LINE.match(start_line)
+        if not response:
+            return None
+        status = int(response.group(1))
+
+    headers: Dict[str, str] = {}
+    name = None
+    for line in lines[1:]:
+        if line[:1] in (" ", "\t") and name:
+            # Folded continuation of the previous header
+            headers[name] += " " + line.strip()
+            continue
+        key, sep, value = line.partition(":")
+        if not sep:
+            continue
+        name = key.strip().lower()
+        name = COMPACT_HEADERS.get(name, name)
+        # Keep the first occurrence (e.g. topmost Via)
+        headers.setdefault(name, value.strip())
+
+    return SipMessage(
+        timestamp=timestamp,
+        start_line=start_line,
+        headers=headers,
+        src=src,
+        dst=dst,
+        method=method,
+        status=status,
+        request_uri=request_uri,
+        body=parts[1] if len(parts) > 1 else "",
+    )
+
+
+def sdp_audio_endpoint(message: SipMessage) -> Optional[Tuple[str, int]]:
+    """Return the (address, port) where a message's SDP wants audio.
+
+    Args:
+        message: SIP message, possibly with an SDP body
+
+    Returns:
+        Normalized IP address and port of the first audio stream, or None
+        if the message carries no usable SDP
+    """
+    if "application/sdp" not in message.headers.get("content-type", "").lower():
+        return None
+    body = message.body
+    audio = SDP_AUDIO.search(body)
+    if audio is None or int(audio.group(1)) == 0:
+        return None
+
+    # A c= line in the audio section overrides the session-level one
+    first_media = SDP_MEDIA.search(body)
+    next_media = SDP_MEDIA.search(body, audio.end())
+    section_end = next_media.start() if next_media else len(body)
+    connection = SDP_CONNECTION.search(body, audio.end(), section_end) or SDP_CONNECTION.search(
+        body, 0, first_media.start()
+    )
+    if connection is None:
+        return None
+    try:
+        return str(ipaddress.ip_address(connection.group(1))), int(audio.group(1))
+    except ValueError:
+        return None
+
+
+def split_stream(buffer: bytearray) -> Tuple[List[bytes], bytearray]:
+    """Split complete SIP messages off the front of a stream buffer.
+
+    Messages are delimited by the blank line after the headers plus
+    Content-Length bytes of body, as required for stream transports.
+
+    Args:
+        buffer: Reassembled stream bytes
+
+    Returns:
+        Tuple of (complete messages, remaining incomplete bytes)
+    """
+    messages = []
+    while True:
+        # Skip CRLF keep-alives between messages
+        start = 0
+        while buffer[start:start + 2] == b"\r\n":
+            start += 2
+        if start:
+            del buffer[:start]
+
+        header_end = buffer.find(b"\r\n\r\n")
+        if header_end < 0:
+            break
+        body_start = header_end + 4
+
+        length_match = re.search(
+            rb"^(?:content-length|l)\s*:\s*(\d+)",
+            bytes(buffer[:header_end]),
+            re.IGNORECASE | re.MULTILINE,
+        )
+        body_len = int(length_match.group(1)) if length_match else 0
+        if len(buffer) < body_start + body_len:
+            break
+
+        messages.append(bytes(buffer[:body_start + body_len]))
+        del buffer[:body_start + body_len]
+
+    return messages, buffer
+
+
+def iter_sip_messages(packets: Iterable[Packet]) -> Iterator[SipMessage]:
+    """Extract SIP messages from decoded capture packets.
+
+    UDP datagrams are parsed directly. TCP segments are reassembled per
+    flow in sequence order; a gap in the sequence space drops the partial
+    message and resynchronizes on the next segment.
+
+    Args:
+        packets: Packets from ``voiptest.capture.pcap.iter_packets``
+
+    Yields:
+        Parsed SIP messages
+    """
+    # (src, sport, dst, dport) -> (next expected seq, buffer)
+    streams: Dict[Tuple[str, int, str, int], Tuple[Optional[int], bytearray]] = {}
+
+    for packet in packets:
+        payload = packet.payload
+        if not payload:
+            continue
+        src = f"{packet.src}:{packet.sport}"
+        dst = f"{packet.dst}:{packet.dport}"
+
+        if packet.transport == "udp":
+            # RTP and other binary traffic fails this test without a copy
+            if not bytes(payload[:10]).startswith(SIP_PREFIXES):
+                continue
+            message = parse_sip_message(
+                bytes(payload).decode("utf-8", "replace"), packet.timestamp, src, dst
+            )
+            if message is not None:
+                yield message
+            continue
+
+        key = (packet.src, packet.sport, packet.dst, packet.dport)
+        next_seq, buffer = streams.get(key, (None, bytearray()))
+        data = payload
+        if next_seq is not None:
+            delta = (packet.tcp_seq - next_seq) & 0xFFFFFFFF
+            if delta >= 0x80000000:
+                # Retransmission: keep only bytes past what we already have
+                overlap = (next_seq - packet.tcp_seq) & 0xFFFFFFFF
+                if overlap >= len(payload):
+                    continue
+                data = payload[overlap:]
+            elif delta:
+                buffer = bytearray()  # Lost segment, resynchronize
+
+        buffer += data
+        streams[key] = ((packet.tcp_seq + len(payload)) & 0xFFFFFFFF, buffer)
+
+        raw_messages, _ = split_stream(buffer)
+        for raw in raw_messages:
+            message = parse_sip_message(
+                raw.decode("utf-8", "replace"), packet.timestamp, src, dst
+            )
+            if message is not None:
+                yield message
+
+
+def parse_message_log(message_log: str) -> List[SipMessage]:
+    """Parse a SIPp ``-trace_msg`` message log into timestamped messages.
+
+    Args:
+        message_log: SIPp message log content
+
+    Returns:
+        SIP messages in log order (timestamps are seconds since midnight)
+    """
+    messages = []
+    separators = list(SIPP_LOG_SEPARATOR.finditer(message_log))
+
+    for index, separator in enumerate(separators):
+        end = separators[index + 1].start() if index + 1 < len(separators) else None
+        entry = message_log[separator.end():end]
+
+        hours, minutes, seconds = separator.group(2, 3, 4)
+        timestamp = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+        # Entry: "<transport> message sent/received ...:" line, blank line, message
+        parts = entry.lstrip("\r\n").split("\n", 1)
+        if len(parts) < 2:
+            continue
+        message = parse_sip_message(parts[1].lstrip("\r\n"), timestamp)
+        if message is not None:
+            messages.append(message)
+
+    return messages
+
+
+def build_dialogs(messages: Iterable[SipMessage]) -> List[Dialog]:
+    """Group SIP messages into dialogs by Call-ID.
+
+    Args:
+        messages: SIP messages in capture order
+
+    Returns:
+        Dialogs ordered by their first message
+    """
+    dialogs: Dict[str, Dialog] = {}
+    for message in messages:
+        call_id = message.call_id
+        if not call_id:
+            continue
+        dialog = dialogs.get(call_id)
+        if dialog is None:
+            dialog = dialogs[call_id] = Dialog(call_id)
+        dialog.messages.append(message)
+
+    return list(dialogs.values())
+
+
+def summarize_dialog(dialog: Dialog) -> Dict[str, Any]:
+    """Compute final code, outcome and timings for a dialog.
+
+    For INVITE dialogs the final code is the last final response to an
+    INVITE before the call is answered (so a 401/407 challenge followed by
+    an authenticated INVITE reports the second answer). Re-INVITE responses
+    after answer are ignored.
+
+    Args:
+        dialog: Dialog to summarize
+
+    Returns:
+        Dictionary with:
+        {
+            "call_id": str,
+            "method": str,
+            "from_user": str | None,
+            "to_user": str | None,
+            "messages": int,
+            "final_sip_code": int | None,
+            "outcome": str,
+            "ring_time_s": float | None,     # first 180/183
+            "setup_time_s": float | None,    # final response
+            "answer_time_s": float | None,   # 2xx to INVITE
+            "call_duration_s": float | None, # answer to BYE
+            "duration_s": float,             # first to last message
+        }
+    """
+    requests = [m for m in dialog.messages if m.is_request]
+    initial = requests[0] if requests else dialog.messages[0]
+    method = initial.method or initial.cseq_method
+    start = initial.timestamp
+
+    ring_at = final_at = answered_at = ended_at = None
+    final_code = None
+
+    for message in dialog.messages:
+        if message.is_request:
+            if method == "INVITE" and message.method in ("BYE", "CANCEL") and ended_at is None:
+                ended_at = message.timestamp
+            continue
+
+        if message.cseq_method != method or answered_at is not None:
+            continue
+        if message.status in (180, 183) and ring_at is None:
+            ring_at = message.timestamp
+        elif message.status >= 200:
+            final_code, final_at = message.status, message.timestamp
+            if method == "INVITE" and 200 <= message.status < 300:
+                answered_at = message.timestamp
+
+    outcome = outcome_for_sip_code(final_code)
+    if outcome is None:
+        outcome = "no_answer" if final_code is None else "failed"
+
+    def since_start(timestamp: Optional[float]) -> Optional[float]:
+        return round(timestamp - start, 6) if timestamp is not None else None
+
+    call_duration = None
+    if answered_at is not None and ended_at is not None:
+        call_duration = round(ended_at - answered_at, 6)
+
+    return {
+        "call_id": dialog.call_id,
+        "method": method,
+        "from_user": initial.header_user("from"),
+        "to_user": initial.header_user("to"),
+        "messages": len(dialog.messages),
+        "final_sip_code": final_code,
+        "outcome": outcome,
+        "ring_time_s": since_start(ring_at),
+        "setup_time_s": since_start(final_at),
+        "answer_time_s": since_start(answered_at),
+        "call_duration_s": call_duration,
+        "duration_s": round(dialog.messages[-1].timestamp - start, 6),
+    }
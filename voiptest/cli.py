@@ -1,12 +1,15 @@
 """CLI interface for voiptest using Typer."""
 
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, Iterator, List, Optional, Union
 
 import typer
 
-from voiptest import runner
-from voiptest.report import junit
+from voiptest import distributed, profiling, runner, trends as trend_analysis
+from voiptest.capture import analyze as capture_analyze
+from voiptest.history import DEFAULT_HISTORY_PATH, HistoryStore
+from voiptest.report import comparison, junit
 
 app = typer.Typer(
     name="voiptest",
@@ -15,10 +18,29 @@ app = typer.Typer(
 )
 
 
-def _run_tests(path: Path, junit_output: bool, out: Optional[Path]) -> None:
+def _run_tests(
+    path: Path,
+    junit_output: bool,
+    out: Optional[Path],
+    capture: bool = False,
+    history_db: Optional[Path] = None,
+    workers: Optional[List[str]] = None,
+    worker_slots: int = 1,
+    profile: bool = False,
+    profile_cprofile: bool = False,
+    jobs: Union[int, str, None] = None,
+    worker_token: str = "",
+) -> None:
     """Shared runner used by both the default invocation and the run subcommand."""
     output_dir = out if out else Path.cwd()
     output_dir.mkdir(parents=True, exist_ok=True)
+    capture_dir = output_dir / "captures" if capture else None
+    history = HistoryStore(history_db) if history_db else None
+
+    profiler = None
+    if profile or profile_cprofile:
+        profiler = profiling.Profiler(output_dir / "profile" if profile_cprofile else None)
+        profiling.enable(profiler)
 
     # Collect test files
     if path.is_file():
@@ -42,7 +64,16 @@ def _run_tests(path: Path, junit_output: bool, out: Optional[Path]) -> None:
     for test_file in test_files:
         typer.echo(f"\n📋 Running: {test_file.name}")
         try:
-            result = runner.run_test_file(test_file)
+            with _profile_file(profiler, test_file):
+                result = runner.run_test_file(
+                    test_file,
+                    capture_dir=capture_dir,
+                    history=history,
+                    workers=workers,
+                    worker_slots=worker_slots,
+                    jobs=jobs,
+                    worker_token=worker_token,
+                )
             all_results.append(result)
 
             passed = sum(1 for run in result["runs"] if run["passed"])
@@ -53,6 +84,28 @@ def _run_tests(path: Path, junit_output: bool, out: Optional[Path]) -> None:
             status = "✅ PASSED" if result["passed"] else "❌ FAILED"
             typer.echo(f"   {status} - {passed}/{len(result['runs'])} tests passed")
 
+            if result.get("targets"):
+                for row in comparison.compare_targets(result)["targets"]:
+                    group = f" ({row['group']})" if row["group"] else ""
+                    p50 = row["latency_p50_s"]
+                    p50_text = f", setup p50 {p50 * 1000:.0f} ms" if p50 is not None else ""
+                    typer.echo(
+                        f"   target {row['name']}{group}: "
+                        f"{row['passed']}/{row['runs']} passed{p50_text}"
+                    )
+
+            if "concurrency" in result:
+                _report_concurrency(result["concurrency"])
+
+            for address, metrics in result.get("workers", {}).items():
+                if metrics["error"] and not metrics["cases"]:
+                    typer.echo(f"   ⚠️  worker {address}: {metrics['error']}", err=True)
+                else:
+                    typer.echo(
+                        f"   worker {address}: {metrics['passed']}/{metrics['cases']} passed, "
+                        f"busy {metrics['busy_s']:.1f}s"
+                    )
+
         except Exception as e:
             typer.echo(f"   ❌ ERROR: {e}", err=True)
             total_failed += 1
@@ -65,9 +118,23 @@ def _run_tests(path: Path, junit_output: bool, out: Optional[Path]) -> None:
 
     if junit_output:
         junit_file = output_dir / "voiptest-results.xml"
-        junit.write_junit_xml(all_results, junit_file)
+        with profiling.span("junit_write"):
+            junit.write_junit_xml(all_results, junit_file)
         typer.echo(f"\n📄 JUnit XML written to: {junit_file}")
 
+    if any(result.get("targets") for result in all_results):
+        comparison_file = output_dir / "voiptest-comparison.md"
+        comparison.write_comparison_markdown(all_results, comparison_file)
+        typer.echo(f"\n📊 Target comparison written to: {comparison_file}")
+
+    if history is not None:
+        history.close()
+        typer.echo(f"\n🗄  History recorded in: {history_db} (run {history.run_id})")
+
+    if profiler is not None:
+        profiling.disable()
+        _report_profile(profiler, output_dir)
+
     typer.echo("\n" + "=" * 50)
     typer.echo(f"Summary: {total_passed} passed, {total_failed} failed")
     typer.echo("=" * 50)
@@ -76,6 +143,60 @@ def _run_tests(path: Path, junit_output: bool, out: Optional[Path]) -> None:
         raise typer.Exit(code=1)
 
 
+def _report_concurrency(concurrency: Dict[str, Any]) -> None:
+    """Print the concurrency each target's scheduler settled on."""
+    limits = concurrency["limits"]
+    typer.echo(
+        f"   jobs {concurrency['requested']}: host limit {limits['max_jobs']} "
+        f"(bound by {limits['bound']}; {limits['cpus']} CPUs, "
+        f"nofile {limits['nofile'] or 'unlimited'}, "
+        f"ephemeral port range {limits['port_range'] or '?'})"
+    )
+    for label, stats in concurrency["targets"].items():
+        signals = ", ".join(f"{count} {name}" for name, count in stats["signals"].items() if count)
+        typer.echo(
+            f"   concurrency {label}: settled at {stats['settled']} "
+            f"(peak {stats['peak']}, {stats['backoffs']} backoff(s)"
+            + (f": {signals}" if signals else "")
+            + f") in {stats['elapsed_s']:.1f}s"
+        )
+
+
+def _parse_jobs(jobs: Optional[str]) -> Union[int, str, None]:
+    if jobs is None or jobs == "auto":
+        return jobs
+    if not jobs.isdigit() or int(jobs) < 1:
+        raise typer.BadParameter("must be a positive number or 'auto'", param_hint="--jobs")
+    return int(jobs)
+
+
+@contextmanager
+def _profile_file(profiler: Optional[profiling.Profiler], test_file: Path) -> Iterator[None]:
+    """Trace one test file as a span, under cProfile when dumps are enabled."""
+    if profiler is None:
+        yield
+        return
+    with profiler.cprofile(test_file.stem), profiler.span("test_file", path=str(test_file)):
+        yield
+
+
+def _report_profile(profiler: profiling.Profiler, output_dir: Path) -> None:
+    """Write the Chrome trace and print the top hot spots by self time."""
+    trace_file = output_dir / "voiptest-profile.json"
+    profiler.write_chrome_trace(trace_file)
+
+    typer.echo(f"\n⏱  Profile written to: {trace_file} (open in chrome://tracing or Perfetto)")
+    if profiler.cprofile_dir is not None:
+        typer.echo(f"   cProfile dumps in: {profiler.cprofile_dir}")
+
+    typer.echo(f"   {'stage':<22} {'count':>6} {'self s':>9} {'total s':>9} {'max s':>8}")
+    for entry in profiler.summary():
+        typer.echo(
+            f"   {entry['name']:<22} {entry['count']:>6} {entry['self_s']:>9.3f} "
+            f"{entry['total_s']:>9.3f} {entry['max_s']:>8.3f}"
+        )
+
+
 @app.callback(invoke_without_command=True)
 def main(ctx: typer.Context) -> None:
     """Show help when no subcommand is provided."""
@@ -101,9 +222,293 @@ def run(
         "--out",
         help="Output directory for reports (default: current directory)",
     ),
+    capture: bool = typer.Option(
+        False,
+        "--capture",
+        help="Record each call with tcpdump into <out>/captures/*.pcap",
+    ),
+    history: bool = typer.Option(
+        True,
+        "--history/--no-history",
+        help="Append results to the local history database",
+    ),
+    history_db: Path = typer.Option(
+        DEFAULT_HISTORY_PATH,
+        "--history-db",
+        help="History database path",
+    ),
+    workers: Optional[str] = typer.Option(
+        None,
+        "--workers",
+        help="Comma-separated worker addresses (host:port) to run cases on",
+    ),
+    worker_slots: int = typer.Option(
+        1,
+        "--worker-slots",
+        help="Concurrent cases per worker",
+    ),
+    worker_token: Optional[str] = typer.Option(
+        None,
+        "--worker-token",
+        envvar=distributed.TOKEN_ENV,
+        help="Shared token the workers were started with",
+    ),
+    profile: bool = typer.Option(
+        False,
+        "--profile",
+        help="Trace each stage and write <out>/voiptest-profile.json (Chrome trace)",
+    ),
+    profile_cprofile: bool = typer.Option(
+        False,
+        "--profile-cprofile",
+        help="Also dump cProfile stats per test file into <out>/profile/",
+    ),
+    jobs: Optional[str] = typer.Option(
+        None,
+        "--jobs",
+        "-j",
+        help="Concurrent cases per target: a number, or 'auto' to adapt to host "
+        "limits and target health (default: one at a time)",
+    ),
 ) -> None:
     """Run VoIP regression tests from YAML configuration."""
-    _run_tests(path, junit_output, out)
+    worker_list = [w.strip() for w in workers.split(",") if w.strip()] if workers else None
+    if worker_list:
+        # Cases run on the workers; these options only apply to local runs
+        if capture:
+            raise typer.BadParameter("cannot be combined with --workers", param_hint="--capture")
+        if jobs is not None:
+            raise typer.BadParameter(
+                "cannot be combined with --workers (use --worker-slots)", param_hint="--jobs"
+            )
+        if not worker_token:
+            raise typer.BadParameter(
+                f"required with --workers (or set {distributed.TOKEN_ENV})",
+                param_hint="--worker-token",
+            )
+    _run_tests(
+        path,
+        junit_output,
+        out,
+        capture,
+        history_db if history else None,
+        worker_list,
+        worker_slots,
+        profile,
+        profile_cprofile,
+        _parse_jobs(jobs),
+        worker_token or "",
+    )
+
+
+@app.command()
+def worker(
+    host: str = typer.Option(
+        "127.0.0.1",
+        "--host",
+        help="Address to listen on (use 0.0.0.0 to accept remote coordinators)",
+    ),
+    port: int = typer.Option(
+        distributed.DEFAULT_WORKER_PORT, "--port", help="TCP port to listen on"
+    ),
+    token: Optional[str] = typer.Option(
+        None,
+        "--token",
+        envvar=distributed.TOKEN_ENV,
+        help="Shared token coordinators must present",
+    ),
+) -> None:
+    """Run cases dispatched by a coordinator (voiptest run --workers)."""
+    if not token:
+        raise typer.BadParameter(
+            f"a shared token is required (or set {distributed.TOKEN_ENV})", param_hint="--token"
+        )
+    server = distributed.WorkerServer(token, host, port)
+    typer.echo(f"🛠  voiptest worker listening on {host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+@app.command()
+def trends(
+    history_db: Path = typer.Option(
+        DEFAULT_HISTORY_PATH,
+        "--history-db",
+        help="History database path",
+    ),
+    baseline: int = typer.Option(
+        20, "--baseline", min=trend_analysis.MIN_SAMPLES, help="Runs in the baseline window"
+    ),
+    recent: int = typer.Option(
+        5,
+        "--recent",
+        min=trend_analysis.MIN_SAMPLES,
+        help="Most recent runs compared to the baseline",
+    ),
+    alpha: float = typer.Option(0.05, "--alpha", help="Significance level"),
+    min_change_pct: float = typer.Option(
+        10.0,
+        "--min-change-pct",
+        help="Minimum median setup latency increase to flag (percent)",
+    ),
+    case: Optional[str] = typer.Option(
+        None,
+        "--case",
+        help="Only analyze cases whose name contains this text",
+    ),
+) -> None:
+    """Flag setup latency and answer rate regressions against a baseline window."""
+    if not history_db.exists():
+        typer.echo(f"❌ History database not found: {history_db}", err=True)
+        raise typer.Exit(code=1)
+
+    with HistoryStore(history_db) as store:
+        results = trend_analysis.detect_regressions(
+            store,
+            baseline=baseline,
+            recent=recent,
+            alpha=alpha,
+            min_change_pct=min_change_pct,
+            case_filter=case,
+        )
+
+    if not results:
+        typer.echo(f"Not enough history yet (need {trend_analysis.MIN_SAMPLES}+ runs per window).")
+        return
+
+    regressions = 0
+    for trend in results:
+        status = "❌ REGRESSION" if trend["regression"] else "✅ OK"
+        typer.echo(f"\n{status}  {trend['case_name']}  [{trend['target']}]")
+        if "latency_recent_s" in trend:
+            marker = "  <--" if trend["latency_regression"] else ""
+            typer.echo(
+                f"   setup latency: {trend['latency_baseline_s']:.3f}s -> "
+                f"{trend['latency_recent_s']:.3f}s ({trend['latency_change_pct']:+.1f}%, "
+                f"p={trend['latency_p']:.4f}){marker}"
+            )
+        marker = "  <--" if trend["answer_rate_regression"] else ""
+        typer.echo(
+            f"   answer rate:   {trend['answer_rate_baseline']:.1%} -> "
+            f"{trend['answer_rate_recent']:.1%} (p={trend['answer_rate_p']:.4f}){marker}"
+        )
+        regressions += trend["regression"]
+
+    typer.echo("\n" + "=" * 50)
+    typer.echo(f"Trends: {len(results)} series, {regressions} regression(s)")
+    typer.echo("=" * 50)
+
+    if regressions:
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def analyze(
+    path: Path = typer.Argument(
+        ...,
+        help="Path to a pcap/pcapng file or a directory of captures",
+    ),
+    config_file: Optional[Path] = typer.Option(
+        None,
+        "--config",
+        help="YAML test file whose expect section is applied to every INVITE dialog",
+    ),
+    ladder: bool = typer.Option(
+        False,
+        "--ladder",
+        help="Print the SIP message ladder of each dialog",
+    ),
+    junit_output: bool = typer.Option(
+        False,
+        "--junit",
+        help="Generate JUnit XML output",
+    ),
+    out: Optional[Path] = typer.Option(
+        None,
+        "--out",
+        help="Output directory for reports (default: current directory)",
+    ),
+) -> None:
+    """Analyze SIP dialogs in packet captures, optionally against expectations."""
+    if path.is_file():
+        captures = [path]
+    elif path.is_dir():
+        captures = sorted(
+            p for p in path.iterdir() if p.suffix in (".pcap", ".pcapng", ".cap")
+        )
+    else:
+        typer.echo(f"❌ Path not found: {path}", err=True)
+        raise typer.Exit(code=1)
+
+    if not captures:
+        typer.echo(f"❌ No capture files found in {path}", err=True)
+        raise typer.Exit(code=1)
+
+    config = runner.load_test_config(config_file) if config_file else None
+
+    all_results = []
+    total_passed = 0
+    total_failed = 0
+
+    for capture_file in captures:
+        typer.echo(f"\n📋 Analyzing: {capture_file.name}")
+        try:
+            result = capture_analyze.analyze_capture(capture_file, config)
+        except Exception as e:
+            typer.echo(f"   ❌ ERROR: {e}", err=True)
+            total_failed += 1
+            all_results.append({
+                "name": capture_file.name,
+                "passed": False,
+                "runs": [],
+                "error": str(e),
+            })
+            continue
+        all_results.append(result)
+
+        incomplete = result["fragments"]["incomplete"]
+        if incomplete:
+            typer.echo(f"   ⚠️  {incomplete} fragmented datagram(s) incomplete and skipped")
+
+        for dialog in result["dialogs"]:
+            answer = dialog["answer_time_s"]
+            answer_text = f"{answer:.3f}s" if answer is not None else "-"
+            typer.echo(
+                f"   {dialog['method']:<9} {dialog['from_user'] or '?'} -> "
+                f"{dialog['to_user'] or '?'}  code={dialog['final_sip_code']} "
+                f"outcome={dialog['outcome']} answer={answer_text}  [{dialog['call_id']}]"
+            )
+
+        for run in result["runs"]:
+            if ladder:
+                typer.echo(f"\n   {run['name']}\n{run['ladder']}")
+            if config is not None:
+                if run["passed"]:
+                    total_passed += 1
+                else:
+                    total_failed += 1
+                    typer.echo(f"   ❌ FAILED: {run['name']} - Actual: {run['actual']}")
+                    if "error" in run:
+                        typer.echo(f"      {run['error']}")
+
+    if junit_output:
+        output_dir = out if out else Path.cwd()
+        output_dir.mkdir(parents=True, exist_ok=True)
+        junit_file = output_dir / "voiptest-analyze.xml"
+        junit.write_junit_xml(all_results, junit_file)
+        typer.echo(f"\n📄 JUnit XML written to: {junit_file}")
+
+    if config is not None or total_failed:
+        typer.echo("\n" + "=" * 50)
+        typer.echo(f"Summary: {total_passed} passed, {total_failed} failed")
+        typer.echo("=" * 50)
+
+    if total_failed > 0:
+        raise typer.Exit(code=1)
 
 
 if __name__ == "__main__":
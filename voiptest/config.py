@@ -1,8 +1,12 @@
 """Configuration models for VoIP test specifications using Pydantic."""
 
-from typing import Any, Dict, List, Literal, Optional
+import csv
+from typing import Annotated, Any, Dict, Iterator, List, Literal, Optional, Union
 
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, field_validator, model_validator
+
+# SIPp injection file modes; the first line of an injection file names one
+INJECTION_MODES = ("SEQUENTIAL", "RANDOM", "USER")
 
 
 class Target(BaseModel):
@@ -12,6 +16,15 @@ class Target(BaseModel):
     port: int = Field(5060, description="Target SIP port")
     transport: Literal["udp", "tcp", "tls"] = Field("udp", description="Transport protocol")
     domain: Optional[str] = Field(None, description="SIP domain")
+    name: Optional[str] = Field(None, description="Label in reports (default: host:port)")
+    group: Optional[str] = Field(
+        None, description="Comparison group, e.g. new/old nodes during a rolling upgrade"
+    )
+
+    @property
+    def label(self) -> str:
+        """Name used to partition results by target."""
+        return self.name or f"{self.host}:{self.port}"
 
 
 class Account(BaseModel):
@@ -43,6 +56,68 @@ class Accounts(BaseModel):
             return None
 
 
+class AccountGenerator(BaseModel):
+    """Numbered account range, e.g. extensions 10000-19999."""
+
+    start: int = Field(..., description="First extension number")
+    count: int = Field(..., gt=0, description="Number of accounts to generate")
+    prefix: str = Field("", description="Prefix prepended to each extension number")
+    width: int = Field(0, description="Zero-pad extension numbers to this width")
+    password: str = Field(
+        "{username}", description="Password template; {username} and {n} are substituted"
+    )
+
+    def iter_accounts(self) -> Iterator[Account]:
+        """Yield the generated accounts in order."""
+        for n in range(self.start, self.start + self.count):
+            username = f"{self.prefix}{n:0{self.width}d}"
+            yield Account(username=username, password=self.password.format(username=username, n=n))
+
+
+class AccountPool(BaseModel):
+    """Pool of accounts injected into SIPp via its CSV file.
+
+    Accounts come from any combination of an inline list, a CSV file
+    (``username;password[;display_name]``, optional header row) and a
+    numbered generator.
+    """
+
+    accounts: List[Account] = Field(default_factory=list, description="Inline accounts")
+    csv: Optional[str] = Field(None, description="CSV file with username;password rows")
+    generate: Optional[AccountGenerator] = Field(None, description="Numbered account range")
+    mode: Literal["SEQUENTIAL", "RANDOM", "USER"] = Field(
+        "SEQUENTIAL", description="SIPp injection mode for the pool's CSV file"
+    )
+
+    @model_validator(mode="after")
+    def _has_source(self) -> "AccountPool":
+        if not self.accounts and self.csv is None and self.generate is None:
+            raise ValueError("account pool needs accounts, csv or generate")
+        return self
+
+    def iter_accounts(self) -> Iterator[Account]:
+        """Yield all accounts in the pool without materializing them."""
+        yield from self.accounts
+
+        if self.csv is not None:
+            with open(self.csv, newline="") as f:
+                for row in csv.reader(f, delimiter=";"):
+                    if not row or not row[0].strip() or row[0].startswith("#"):
+                        continue
+                    username = row[0].strip()
+                    # Header row or SIPp injection-file mode line
+                    if username.lower() == "username" or username in INJECTION_MODES:
+                        continue
+                    yield Account(
+                        username=username,
+                        password=row[1].strip() if len(row) > 1 else "",
+                        display_name=row[2].strip() if len(row) > 2 and row[2].strip() else None,
+                    )
+
+        if self.generate is not None:
+            yield from self.generate.iter_accounts()
+
+
 class Call(BaseModel):
     """Call parameters."""
 
@@ -55,8 +130,8 @@ class Call(BaseModel):
 class Expect(BaseModel):
     """Expected call outcome."""
 
-    outcome: Literal["answered", "failed", "busy", "no_answer"] = Field(
-        ..., description="Expected call outcome"
+    outcome: Optional[Literal["answered", "failed", "busy", "no_answer"]] = Field(
+        None, description="Expected call outcome (required for call tests)"
     )
     final_sip_code: Optional[int] = Field(
         None, description="Expected final SIP response code"
@@ -67,6 +142,128 @@ class Expect(BaseModel):
     min_duration_s: Optional[int] = Field(
         None, description="Minimum call duration for success (seconds)"
     )
+    max_jitter_ms: Optional[float] = Field(
+        None, description="Maximum RFC 3550 interarrival jitter of the return stream (ms)"
+    )
+    max_loss_pct: Optional[float] = Field(
+        None, description="Maximum packet loss of the return stream (percent)"
+    )
+    max_reorder_pct: Optional[float] = Field(
+        None, description="Maximum share of out-of-order packets in the return stream (percent)"
+    )
+    min_mos: Optional[float] = Field(
+        None, description="Minimum estimated MOS (E-model) of the return stream"
+    )
+    min_register_success_pct: Optional[float] = Field(
+        None, description="Minimum share of successful registrations (percent, default 100)"
+    )
+    max_register_p95_ms: Optional[float] = Field(
+        None, description="Maximum 95th percentile registration latency (ms)"
+    )
+
+
+class Media(BaseModel):
+    """RTP media parameters for calls that exchange audio."""
+
+    pcap: str = Field(..., description="Pcap file with the RTP stream SIPp plays to the target")
+    talk_time_s: int = Field(5, description="How long to keep the call up while media flows")
+    local_ip: str = Field("127.0.0.1", description="Local IP advertised for the return stream")
+    local_port: int = Field(0, description="Local RTP receive port (0 picks a free port)")
+    clock_rate: int = Field(8000, description="RTP clock rate of the return stream (Hz)")
+
+
+class Register(BaseModel):
+    """REGISTER storm parameters."""
+
+    pool: str = Field(..., description="Account pool to register")
+    rate: float = Field(10.0, gt=0, description="Registrations started per second")
+    count: Optional[int] = Field(
+        None, gt=0, description="Registrations to send (default: pool size)"
+    )
+    max_concurrent: Optional[int] = Field(
+        None, gt=0, description="Maximum registrations in flight at once"
+    )
+    expires: int = Field(3600, description="Expires value requested in each REGISTER")
+    timeout_s: int = Field(10, description="Maximum time to wait for each response (seconds)")
+
+
+class TalkStep(BaseModel):
+    """Keep the call up (media keeps flowing if configured)."""
+
+    action: Literal["talk"] = "talk"
+    duration_s: float = Field(..., gt=0, description="Talk time (seconds)")
+
+
+class DtmfStep(BaseModel):
+    """Send DTMF digits as SIP INFO (application/dtmf-relay), one per digit."""
+
+    action: Literal["dtmf"] = "dtmf"
+    digits: str = Field(..., pattern=r"^[0-9*#A-D]+$", description="Digits to send")
+    duration_ms: int = Field(160, gt=0, description="Tone duration per digit (ms)")
+    interval_ms: int = Field(250, ge=0, description="Pause between digits (ms)")
+
+
+class HoldStep(BaseModel):
+    """Put the call on hold with a sendonly re-INVITE, then resume it."""
+
+    action: Literal["hold"] = "hold"
+    duration_s: float = Field(5, gt=0, description="Time on hold (seconds)")
+
+
+class ReinviteStep(BaseModel):
+    """Send a re-INVITE with the given media direction."""
+
+    action: Literal["reinvite"] = "reinvite"
+    direction: Literal["sendrecv", "sendonly", "recvonly", "inactive"] = Field(
+        "sendrecv", description="SDP media direction attribute"
+    )
+
+
+class TransferStep(BaseModel):
+    """Blind transfer with REFER, acknowledging the transfer NOTIFYs.
+
+    RFC 3515 REFER recipients send an initial NOTIFY (100 Trying) and a
+    final one with the transfer result.
+    """
+
+    action: Literal["transfer"] = "transfer"
+    to: str = Field(..., description="Transfer target account key or literal destination")
+    notifies: int = Field(2, ge=0, description="NOTIFY requests to expect and answer")
+
+
+class WaitStep(BaseModel):
+    """Wait for an in-dialog request from the far end and answer it with 200.
+
+    Only requests that a bare 200 OK answers are allowed. INVITE and UPDATE
+    may carry an SDP offer that needs an SDP answer (and INVITE an ACK).
+    """
+
+    action: Literal["wait"] = "wait"
+    request: Literal["BYE", "INFO", "OPTIONS", "NOTIFY", "MESSAGE"] = Field(
+        "BYE", description="Request method to wait for"
+    )
+    timeout_s: int = Field(30, gt=0, description="Maximum wait (seconds)")
+
+    @field_validator("request", mode="before")
+    @classmethod
+    def _upper_method(cls, value: Any) -> Any:
+        return value.upper() if isinstance(value, str) else value
+
+
+FlowStep = Annotated[
+    Union[TalkStep, DtmfStep, HoldStep, ReinviteStep, TransferStep, WaitStep],
+    Field(discriminator="action"),
+]
+
+# Field set by the shorthand form of each step, e.g. "- dtmf: 123"
+FLOW_SHORTHAND_FIELDS = {
+    "talk": "duration_s",
+    "dtmf": "digits",
+    "hold": "duration_s",
+    "reinvite": "direction",
+    "transfer": "to",
+    "wait": "request",
+}
 
 
 class Matrix(BaseModel):
@@ -80,13 +277,91 @@ class VoipTestConfig(BaseModel):
 
     version: int = Field(1, description="Config schema version")
     name: str = Field(..., description="Test scenario name")
-    target: Target = Field(..., description="Target VoIP server")
-    accounts: Accounts = Field(..., description="Test accounts")
-    call: Call = Field(..., description="Call parameters")
+    type: Literal["call", "register"] = Field("call", description="Test type")
+    target: Optional[Target] = Field(None, description="Target VoIP server")
+    targets: List[Target] = Field(
+        default_factory=list, description="Targets that each case fans out to concurrently"
+    )
+    accounts: Accounts = Field(default_factory=Accounts, description="Test accounts")
+    pools: Dict[str, AccountPool] = Field(
+        default_factory=dict, description="Named account pools"
+    )
+    call: Optional[Call] = Field(None, description="Call parameters (call tests)")
+    registration: Optional[Register] = Field(
+        None, alias="register", description="REGISTER storm parameters"
+    )
     expect: Expect = Field(..., description="Expected outcome")
+    media: Optional[Media] = Field(None, description="Send and measure RTP media during the call")
+    flow: Optional[List[FlowStep]] = Field(
+        None, description="In-call steps after the answer (compiled into the SIPp scenario)"
+    )
     matrix: Optional[Matrix] = Field(None, description="Matrix expansion for multiple targets")
 
     class Config:
         """Pydantic configuration."""
 
         populate_by_name = True
+
+    @field_validator("flow", mode="before")
+    @classmethod
+    def _expand_flow_shorthand(cls, steps: Any) -> Any:
+        # "- dtmf: 123" and "- hold: {duration_s: 3}" mean {action: dtmf, digits: 123}
+        # and {action: hold, duration_s: 3}
+        if not isinstance(steps, list):
+            return steps
+        expanded = []
+        for step in steps:
+            if isinstance(step, dict) and "action" not in step and len(step) == 1:
+                action, value = next(iter(step.items()))
+                if action in FLOW_SHORTHAND_FIELDS:
+                    if isinstance(value, dict):
+                        step = {"action": action, **value}
+                    elif value is None:
+                        step = {"action": action}
+                    else:
+                        # Unquoted YAML digits ("- dtmf: 123") arrive as numbers
+                        if action in ("dtmf", "transfer") and isinstance(value, int):
+                            value = str(value)
+                        step = {"action": action, FLOW_SHORTHAND_FIELDS[action]: value}
+            elif isinstance(step, str) and step in FLOW_SHORTHAND_FIELDS:
+                step = {"action": step}
+            expanded.append(step)
+        return expanded
+
+    @model_validator(mode="after")
+    def _check_targets(self) -> "VoipTestConfig":
+        if self.target is not None and self.targets:
+            raise ValueError("use either target or targets, not both")
+        if self.target is None and not self.targets:
+            raise ValueError("a target or targets section is required")
+        labels = [target.label for target in self.targets]
+        duplicates = sorted({label for label in labels if labels.count(label) > 1})
+        if duplicates:
+            raise ValueError(f"duplicate target names: {', '.join(duplicates)}")
+        return self
+
+    @model_validator(mode="after")
+    def _check_type_sections(self) -> "VoipTestConfig":
+        if self.type == "call":
+            if self.call is None:
+                raise ValueError("call tests need a call section")
+            if self.expect.outcome is None:
+                raise ValueError("call tests need expect.outcome")
+            for step in (self.flow or [])[:-1]:
+                if isinstance(step, WaitStep) and step.request == "BYE":
+                    raise ValueError("waiting for BYE ends the call; it must be the last flow step")
+                if isinstance(step, TransferStep):
+                    raise ValueError("a transfer hands the call off; it must be the last flow step")
+        elif self.type == "register":
+            if self.registration is None:
+                raise ValueError("register tests need a register section")
+            if self.registration.pool not in self.pools:
+                raise ValueError(f"unknown account pool: {self.registration.pool}")
+            if self.pools[self.registration.pool].mode == "USER":
+                # USER rows are picked per SIPp user (-users), which ignores the rate
+                raise ValueError("register tests need a SEQUENTIAL or RANDOM pool, not USER")
+            if self.matrix is not None:
+                raise ValueError("matrix expansion only applies to call tests")
+            if self.flow is not None:
+                raise ValueError("flow steps only apply to call tests")
+        return self
@@ -0,0 +1,347 @@
+"""Coordinator/worker execution of test cases across several hosts.
+
+Workers (``voiptest worker``) accept connections over TCP and run the
+cases they receive with the local engine. The coordinator expands a test
+file into cases with ``runner.expand_matrix`` and hands them out to
+worker connections from a shared queue, so faster workers take more
+cases. A case whose worker connection fails is requeued for the
+remaining connections.
+
+Protocol: each message is a 4-byte big-endian length followed by a UTF-8
+JSON object. Requests are ``{"op": "hello", "token": <shared token>}`` and
+``{"op": "run", "case": <config dict>}``; responses carry ``"ok"`` plus
+either the payload or ``"error"``. A connection must complete the hello
+with the worker's token before it may run cases. Frames larger than
+``MAX_FRAME_BYTES`` (``HELLO_FRAME_BYTES`` before the hello) close the
+connection before anything is allocated for them.
+"""
+
+import hmac
+import json
+import queue
+import socket
+import socketserver
+import struct
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from voiptest import __version__, profiling
+from voiptest.config import VoipTestConfig
+
+DEFAULT_WORKER_PORT = 7070
+
+# Environment variable holding the shared worker token
+TOKEN_ENV = "VOIPTEST_WORKER_TOKEN"
+
+FRAME_HEADER = struct.Struct("!I")
+
+# Largest frame accepted; cases with inlined account pools and results with
+# SIPp logs stay well below this
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+# Largest frame accepted from a peer that has not sent a valid hello yet
+HELLO_FRAME_BYTES = 4096
+
+# Connection timeout for reaching a worker; running a case has no timeout
+# because the engine enforces its own per-case limits.
+CONNECT_TIMEOUT_S = 5.0
+
+
+def send_message(sock: socket.socket, message: Dict[str, Any]) -> None:
+    """Send one length-prefixed JSON message."""
+    data = json.dumps(message, default=str).encode("utf-8")
+    sock.sendall(FRAME_HEADER.pack(len(data)) + data)
+
+
+def recv_message(
+    sock: socket.socket, max_bytes: int = MAX_FRAME_BYTES
+) -> Optional[Dict[str, Any]]:
+    """Receive one length-prefixed JSON message.
+
+    Args:
+        sock: Connected socket
+        max_bytes: Largest message accepted
+
+    Returns:
+        The decoded message, or None if the peer closed the connection
+
+    Raises:
+        ValueError: If the message is larger than max_bytes or not JSON
+    """
+    header = _recv_exact(sock, FRAME_HEADER.size)
+    if header is None:
+        return None
+    (length,) = FRAME_HEADER.unpack(header)
+    if length > max_bytes:
+        raise ValueError(f"Message of {length} bytes exceeds the {max_bytes} byte limit")
+    data = _recv_exact(sock, length)
+    if data is None:
+        raise ConnectionError("Connection closed mid-message")
+    return json.loads(data.decode("utf-8"))
+
+
+def _recv_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+    buf = bytearray(size)
+    view = memoryview(buf)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:])
+        if n == 0:
+            if received == 0:
+                return None
+            raise ConnectionError("Connection closed mid-message")
+        received += n
+    return bytes(buf)
+
+
+def parse_worker_address(address: str) -> Tuple[str, int]:
+    """Parse "host:port" (port defaults to DEFAULT_WORKER_PORT)."""
+    host, sep, port = address.strip().rpartition(":")
+    if not sep:
+        return address.strip(), DEFAULT_WORKER_PORT
+    return host.strip("[]"), int(port)
+
+
+# ---------------------------------------------------------------------------
+# Worker
+# ---------------------------------------------------------------------------
+
+
+class _WorkerHandler(socketserver.BaseRequestHandler):
+    """Serve requests from one coordinator connection until it closes."""
+
+    def handle(self) -> None:
+        # Imported here: the runner imports this module for the coordinator
+        from voiptest.engines import sipp
+
+        authenticated = False
+        while True:
+            try:
+                request = recv_message(
+                    self.request, MAX_FRAME_BYTES if authenticated else HELLO_FRAME_BYTES
+                )
+            except (ConnectionError, OSError, ValueError):
+                # Oversized or malformed frames end the connection
+                return
+            if request is None:
+                return
+
+            op = request.get("op")
+            if op == "hello":
+                token = str(request.get("token") or "")
+                if not hmac.compare_digest(token.encode(), self.server.token.encode()):
+                    # Drop the connection: nothing else is served without the token
+                    try:
+                        send_message(self.request, {"ok": False, "error": "Invalid token"})
+                    except OSError:
+                        pass
+                    return
+                authenticated = True
+                response = {
+                    "ok": True,
+                    "version": __version__,
+                    "host": socket.gethostname(),
+                    "engine_version": sipp.get_sipp_version(),
+                }
+            elif not authenticated:
+                response = {"ok": False, "error": "Send hello with the worker token first"}
+            elif op == "run":
+                response = _run_case(request.get("case"))
+            else:
+                response = {"ok": False, "error": f"Unknown op: {op}"}
+
+            try:
+                send_message(self.request, response)
+            except OSError:
+                return
+
+
+def _run_case(case: Any) -> Dict[str, Any]:
+    """Validate and run one case received from a coordinator."""
+    from voiptest import runner
+    from voiptest.engines import sipp
+
+    try:
+        config = VoipTestConfig(**case)
+    except Exception as e:
+        return {"ok": False, "error": f"Invalid case: {e}"}
+
+    # Coordinators inline CSV pools; a path would read a worker-local file
+    if any(pool.csv is not None for pool in config.pools.values()):
+        return {"ok": False, "error": "Invalid case: CSV account pools must be sent inline"}
+
+    try:
+        result = runner.run_single_test(config)
+    except Exception as e:
+        return {"ok": False, "error": f"Case failed on worker: {e}"}
+    result["engine_version"] = sipp.get_sipp_version()
+    return {"ok": True, "result": result}
+
+
+class WorkerServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    """TCP server running cases for coordinators, one thread per connection."""
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(
+        self, token: str, host: str = "127.0.0.1", port: int = DEFAULT_WORKER_PORT
+    ) -> None:
+        if not token:
+            raise ValueError("A worker token is required")
+        self.token = token
+        super().__init__((host, port), _WorkerHandler)
+
+
+# ---------------------------------------------------------------------------
+# Coordinator
+# ---------------------------------------------------------------------------
+
+
+def _case_payload(config: VoipTestConfig) -> Dict[str, Any]:
+    """Serialize a case for a worker.
+
+    CSV-backed account pools are inlined so workers do not need the
+    coordinator's files. Media pcap paths must exist on the workers.
+    """
+    config = config.model_copy(deep=True)
+    for pool in config.pools.values():
+        if pool.csv is not None:
+            pool.accounts = list(pool.iter_accounts())
+            pool.csv = None
+            pool.generate = None
+    return config.model_dump(by_alias=True)
+
+
+def _error_result(config: VoipTestConfig, error: str) -> Dict[str, Any]:
+    return {
+        "name": config.name,
+        "passed": False,
+        "config": config.model_dump(by_alias=True),
+        "actual": {},
+        "error": error,
+    }
+
+
+def run_cases(
+    cases: List[VoipTestConfig],
+    workers: List[str],
+    slots_per_worker: int = 1,
+    token: str = "",
+) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+    """Run cases on remote workers and merge their results.
+
+    Args:
+        cases: Expanded test cases
+        workers: Worker addresses ("host:port")
+        slots_per_worker: Concurrent cases per worker (one connection each)
+        token: Shared worker token
+
+    Returns:
+        Tuple of (results in case order, per-worker metrics):
+        metrics[address] = {"cases", "passed", "busy_s", "engine_version", "error"}
+    """
+    pending: "queue.Queue[Tuple[int, int]]" = queue.Queue()
+    for index in range(len(cases)):
+        pending.put((index, 0))
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(cases)
+    metrics: Dict[str, Dict[str, Any]] = {
+        address: {"cases": 0, "passed": 0, "busy_s": 0.0, "engine_version": None, "error": None}
+        for address in workers
+    }
+    lock = threading.Lock()
+    # A case may be retried on every connection, including other slots of
+    # the same worker
+    max_attempts = len(workers) * max(slots_per_worker, 1)
+    # Cases without a final result; idle connections wait on this rather than
+    # exiting, so a case requeued by a failing worker is still picked up
+    remaining = [len(cases)]
+
+    def finish(index: int, result: Dict[str, Any]) -> None:
+        with lock:
+            results[index] = result
+            remaining[0] -= 1
+
+    def worker_loop(address: str) -> None:
+        host, port = parse_worker_address(address)
+        try:
+            sock = socket.create_connection((host, port), timeout=CONNECT_TIMEOUT_S)
+            sock.settimeout(None)
+            send_message(sock, {"op": "hello", "token": token})
+            hello = recv_message(sock)
+            if not hello or not hello.get("ok"):
+                error = hello.get("error") if hello else "connection closed"
+                raise ConnectionError(f"Worker handshake failed: {error}")
+        except (OSError, ValueError) as e:
+            with lock:
+                metrics[address]["error"] = str(e)
+            return
+
+        with lock:
+            metrics[address]["engine_version"] = hello.get("engine_version")
+
+        with sock:
+            while True:
+                with lock:
+                    if remaining[0] == 0:
+                        return
+                try:
+                    index, attempts = pending.get(timeout=0.2)
+                except queue.Empty:
+                    continue
+
+                config = cases[index]
+                try:
+                    payload = _case_payload(config)
+                except (OSError, ValueError) as e:
+                    # A local configuration error (e.g. an unreadable CSV pool);
+                    # retrying on another worker would not help
+                    finish(index, _error_result(config, f"Invalid case: {e}"))
+                    continue
+
+                try:
+                    with profiling.span("dispatch", name=config.name, worker=address):
+                        send_message(sock, {"op": "run", "case": payload})
+                        response = recv_message(sock)
+                    if response is None:
+                        raise ConnectionError("Worker closed the connection")
+                except (OSError, ValueError) as e:
+                    # Give the case to another worker; this connection is done
+                    with lock:
+                        metrics[address]["error"] = str(e)
+                    if attempts + 1 < max_attempts:
+                        pending.put((index, attempts + 1))
+                    else:
+                        finish(index, _error_result(config, f"Worker {address} failed: {e}"))
+                    return
+
+                if response.get("ok"):
+                    result = response["result"]
+                else:
+                    result = _error_result(config, response.get("error", "Worker error"))
+                result["worker"] = address
+                finish(index, result)
+
+                with lock:
+                    metrics[address]["cases"] += 1
+                    metrics[address]["passed"] += int(bool(result.get("passed")))
+                    metrics[address]["busy_s"] += float(result.get("duration_s") or 0.0)
+
+    threads = [
+        threading.Thread(target=worker_loop, args=(address,), daemon=True)
+        for address in workers
+        for _ in range(max(slots_per_worker, 1))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Cases left over when every worker connection failed
+    final = []
+    for index, result in enumerate(results):
+        if result is None:
+            result = _error_result(cases[index], "No worker available to run this case")
+        final.append(result)
+
+    return final, metrics
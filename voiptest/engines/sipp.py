@@ -5,27 +5,37 @@ VoIP regression tests.
 """
 
 import csv
+import functools
+import math
 import os
 import re
 import shutil
+import socket
 import subprocess
 import tempfile
 import time
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
+from voiptest import expectations, flow, profiling
+from voiptest.capture.sip import build_dialogs, parse_message_log, summarize_dialog
 from voiptest.config import VoipTestConfig
+from voiptest.engines import sipp_flow
+from voiptest.media.rtp import RtpPackets, RtpReceiver
+from voiptest.trends import percentile
 
 # Get the directory where this module lives
 ENGINE_DIR = Path(__file__).parent
 SCENARIO_DIR = ENGINE_DIR / "sipp_scenarios"
 
 
-def execute_test(config: VoipTestConfig) -> Dict[str, Any]:
+def execute_test(config: VoipTestConfig, capture_dir: Optional[Path] = None) -> Dict[str, Any]:
     """Execute a VoIP test using SIPp.
 
     Args:
         config: Validated test configuration
+        capture_dir: If set, record the call's traffic with tcpdump into a
+                     pcap file in this directory
 
     Returns:
         Dictionary with test results:
@@ -35,6 +45,7 @@ def execute_test(config: VoipTestConfig) -> Dict[str, Any]:
             "config": dict,  # Original config
             "actual": dict,  # Actual outcomes
             "duration_s": float,
+            "capture": str (optional),  # pcap path
             "error": str (optional)
         }
     """
@@ -52,19 +63,45 @@ def execute_test(config: VoipTestConfig) -> Dict[str, Any]:
                 "error": "SIPp not found in PATH. Please install SIPp.",
             }
 
+        # Start the RTP receiver first so its port can go into the SDP
+        receiver = None
+        if config.media is not None:
+            with profiling.span("rtp_receiver_start"):
+                receiver = RtpReceiver(config.media.local_ip, config.media.local_port)
+                receiver.start()
+
+        capture_file = None
+        if capture_dir is not None:
+            capture_file = Path(capture_dir) / f"{safe_filename(config.name)}.pcap"
+
         # Run SIPp and get raw results
-        sipp_result = run_sipp(config)
+        try:
+            sipp_result = run_sipp(
+                config,
+                rtp_port=receiver.port if receiver else None,
+                capture_file=capture_file,
+            )
+        finally:
+            packets = receiver.stop() if receiver else None
 
         # Extract actual outcome from SIPp results
+        message_log = sipp_result.get("logs", {}).get("message_log", "")
+        with profiling.span("parse_dialogs"):
+            answer_time = extract_answer_time(message_log)
         actual = {
             "outcome": determine_outcome(sipp_result, config),
             "sip_code": sipp_result.get("final_code"),
-            "answer_time_s": None,  # Could parse from trace if needed
+            "answer_time_s": answer_time,
             "duration_s": time.time() - start_time,
         }
 
+        if packets is not None:
+            with profiling.span("media_analysis", packets=len(packets)):
+                actual["media"] = analyze_media(packets, config)
+
         # Compare actual vs expected
-        passed = check_expectations(config, actual, sipp_result)
+        with profiling.span("check_expectations"):
+            passed = check_expectations(config, actual, sipp_result)
 
         result = {
             "name": config.name,
@@ -82,6 +119,9 @@ def execute_test(config: VoipTestConfig) -> Dict[str, Any]:
         if "logs" in sipp_result:
             result["logs"] = sipp_result["logs"]
 
+        if capture_file is not None and capture_file.exists():
+            result["capture"] = str(capture_file)
+
         return result
 
     except Exception as e:
@@ -95,11 +135,17 @@ def execute_test(config: VoipTestConfig) -> Dict[str, Any]:
         }
 
 
-def run_sipp(config: VoipTestConfig) -> Dict[str, Any]:
+def run_sipp(
+    config: VoipTestConfig,
+    rtp_port: Optional[int] = None,
+    capture_file: Optional[Path] = None,
+) -> Dict[str, Any]:
     """Run SIPp subprocess and return raw results.
 
     Args:
         config: Test configuration
+        rtp_port: Local port of the RTP receiver when the test has media
+        capture_file: If set, capture the call's traffic into this pcap file
 
     Returns:
         Dictionary with:
@@ -123,10 +169,26 @@ def run_sipp(config: VoipTestConfig) -> Dict[str, Any]:
     try:
         # Generate CSV injection file
         csv_file = temp_path / "inject.csv"
-        generate_csv_file(csv_file, config)
+        with profiling.span("write_csv"):
+            calls = generate_csv_file(csv_file, config, rtp_port=rtp_port)
+        if calls == 0:
+            return {
+                "final_code": None,
+                "reason": f"Account pool is empty: {config.call.from_}",
+                "logs": {"temp_dir": temp_dir},
+                "exit_code": -1,
+            }
 
-        # Prepare SIPp command
-        scenario_file = SCENARIO_DIR / "uac_basic.xml"
+        # Prepare SIPp command: a flow compiles into its own (cached) scenario
+        if config.flow is not None:
+            with profiling.span("compile_flow"):
+                compiled = flow.compile_flow(
+                    config, lambda dest: resolve_destination(config, dest)
+                )
+                scenario_file = sipp_flow.scenario_file(compiled, fallback_dir=temp_path)
+        else:
+            scenario_name = "uac_media.xml" if config.media is not None else "uac_basic.xml"
+            scenario_file = SCENARIO_DIR / scenario_name
         if not scenario_file.exists():
             return {
                 "final_code": None,
@@ -135,42 +197,76 @@ def run_sipp(config: VoipTestConfig) -> Dict[str, Any]:
                 "exit_code": -1,
             }
 
+        # SIPp plays the media file from its working directory
+        if config.media is not None:
+            pcap_file = Path(config.media.pcap)
+            if not pcap_file.exists():
+                return {
+                    "final_code": None,
+                    "reason": f"Media pcap not found: {pcap_file}",
+                    "logs": {"temp_dir": temp_dir},
+                    "exit_code": -1,
+                }
+            shutil.copyfile(pcap_file, temp_path / "media.pcap")
+
         # Extract domain from config
         domain = config.target.domain or config.target.host
 
+        # A pool caller places one call per account: one at a time, except in
+        # USER mode, where SIPp picks each user's row by its user id and all
+        # users call at once
+        pool = config.pools.get(config.call.from_)
+        users = pool is not None and pool.mode == "USER"
+        in_series = 1 if users else calls
+        sipp_timeout = (
+            in_series * config.call.timeout_s + (in_series - 1) * math.ceil(talk_time_s(config))
+        )
+
+        sip_port = find_free_port(config.target.transport)
+        media_port = find_free_port("udp", span=4)
+
         # Build SIPp command
         cmd = [
             "sipp",
             config.target.host,
             "-i", "127.0.0.1",  # Local IP (use IPv4 to match localhost resolution)
-            "-p", "5070",  # Local port (avoid conflict with target)
+            "-p", str(sip_port),  # Free local SIP port
+            "-mp", str(media_port),  # Free local media ports
             "-sf", str(scenario_file),
             "-inf", str(csv_file),
-            "-m", "1",  # Max calls
-            "-l", "1",  # Call rate limit
-            "-r", "1",  # Call rate
-            "-timeout", str(config.call.timeout_s),
+            "-m", str(calls),  # Max calls
+        ]
+        if users:
+            cmd.extend(["-users", str(calls)])
+        else:
+            cmd.extend([
+                "-l", "1",  # Call rate limit
+                "-r", "1",  # Call rate
+            ])
+        cmd.extend([
+            "-timeout", str(sipp_timeout),
             "-timeout_error",
             "-trace_msg",
             "-trace_err",
             "-nd",  # No default behavior on unexpected messages
-        ]
+        ])
+
+        # Talk time for the media scenario's <pause/>
+        if config.media is not None and config.flow is None:
+            cmd.extend(["-d", str(config.media.talk_time_s * 1000)])
 
         # Add transport
-        if config.target.transport.lower() == "tcp":
-            cmd.append("-t")
-            cmd.append("t1")
-        elif config.target.transport.lower() == "tls":
-            cmd.append("-t")
-            cmd.append("l1")
+        cmd.extend(transport_args(config))
 
         # Add remote port
         cmd.extend(["-rsa", f"{config.target.host}:{config.target.port}"])
 
         # Set auth if provided
-        if config.accounts.caller.username and config.accounts.caller.password:
-            cmd.extend(["-au", config.accounts.caller.username])
-            cmd.extend(["-ap", config.accounts.caller.password])
+        # Pool callers authenticate per CSV row through the scenario instead
+        caller = config.accounts.caller
+        if config.call.from_ not in config.pools and caller and caller.username and caller.password:
+            cmd.extend(["-au", caller.username])
+            cmd.extend(["-ap", caller.password])
 
         # Set message log file
         msg_log = temp_path / "messages.log"
@@ -178,23 +274,33 @@ def run_sipp(config: VoipTestConfig) -> Dict[str, Any]:
         cmd.extend(["-message_file", str(msg_log)])
         cmd.extend(["-error_file", str(err_log)])
 
-        # Run SIPp
-        result = subprocess.run(
-            cmd,
-            cwd=temp_dir,
-            capture_output=True,
-            text=True,
-            timeout=config.call.timeout_s + 10,  # Add buffer
-        )
+        # Run SIPp, optionally under a packet capture
+        capture = None
+        if capture_file:
+            capture = start_capture(config, capture_file, sip_port, media_port, rtp_port)
+        try:
+            result = run_process(
+                cmd,
+                cwd=temp_dir,
+                timeout=sipp_timeout + talk_time_s(config) + 10,  # Add buffer
+            )
+        finally:
+            if capture is not None:
+                stop_capture(capture)
 
         # Read logs
         stdout = result.stdout
         stderr = result.stderr
-        message_log = msg_log.read_text() if msg_log.exists() else ""
-        error_log = err_log.read_text() if err_log.exists() else ""
+        with profiling.span("read_logs"):
+            message_log = msg_log.read_text() if msg_log.exists() else ""
+            error_log = err_log.read_text() if err_log.exists() else ""
 
         # Extract final SIP code from message log
-        final_code = extract_final_sip_code(message_log)
+        with profiling.span("parse_logs"):
+            if calls > 1:
+                final_code = extract_pool_final_code(message_log)
+            else:
+                final_code = extract_final_sip_code(message_log)
 
         # Determine reason
         reason = "success"
@@ -235,6 +341,352 @@ def run_sipp(config: VoipTestConfig) -> Dict[str, Any]:
         }
 
 
+def execute_registration(
+    config: VoipTestConfig, capture_dir: Optional[Path] = None
+) -> Dict[str, Any]:
+    """Execute a REGISTER storm test using SIPp.
+
+    Registers the accounts of a pool at the configured rate and checks the
+    success rate and registration latency (first REGISTER to final 200,
+    including the authentication round trip).
+
+    Args:
+        config: Validated test configuration with a register section
+        capture_dir: If set, record the storm with tcpdump into this directory
+
+    Returns:
+        Dictionary with test results (same shape as execute_test), where
+        actual["registration"] holds:
+        {
+            "attempted": int,
+            "succeeded": int,
+            "failed": int,            # SIPp FailedCall(C)
+            "unfinished": int,        # neither succeeded nor failed (storm timeout)
+            "success_pct": float,
+            "latency_ms": {"min", "mean", "p50", "p95", "p99", "max"} | None
+        }
+    """
+    start_time = time.time()
+
+    try:
+        if not validate_sipp_installed():
+            return {
+                "name": config.name,
+                "passed": False,
+                "config": config.model_dump(by_alias=True),
+                "actual": {},
+                "duration_s": 0.0,
+                "error": "SIPp not found in PATH. Please install SIPp.",
+            }
+
+        capture_file = None
+        if capture_dir is not None:
+            capture_file = Path(capture_dir) / f"{safe_filename(config.name)}.pcap"
+
+        sipp_result = run_sipp_register(config, capture_file=capture_file)
+        registration = sipp_result.get("registration")
+
+        if registration is None:
+            outcome = "failed"
+        elif registration["succeeded"] == registration["attempted"]:
+            outcome = "registered"
+        else:
+            outcome = "failed"
+
+        actual = {
+            "outcome": outcome,
+            "sip_code": None,
+            "registration": registration,
+            "duration_s": time.time() - start_time,
+        }
+        passed = registration is not None and expectations.check_expectations(
+            config.expect, actual
+        )
+
+        result = {
+            "name": config.name,
+            "passed": passed,
+            "config": config.model_dump(by_alias=True),
+            "actual": actual,
+            "duration_s": time.time() - start_time,
+        }
+        if "reason" in sipp_result and not passed:
+            result["error"] = sipp_result["reason"]
+        if "logs" in sipp_result:
+            result["logs"] = sipp_result["logs"]
+        if capture_file is not None and capture_file.exists():
+            result["capture"] = str(capture_file)
+
+        return result
+
+    except Exception as e:
+        return {
+            "name": config.name,
+            "passed": False,
+            "config": config.model_dump(by_alias=True),
+            "actual": {},
+            "duration_s": time.time() - start_time,
+            "error": f"Exception during test execution: {str(e)}",
+        }
+
+
+def run_sipp_register(
+    config: VoipTestConfig, capture_file: Optional[Path] = None
+) -> Dict[str, Any]:
+    """Run a SIPp REGISTER storm and collect counts and latencies.
+
+    Args:
+        config: Test configuration with a register section
+        capture_file: If set, capture the storm's traffic into this pcap file
+
+    Returns:
+        Dictionary with:
+        {
+            "registration": dict | None,
+            "reason": str,
+            "logs": {"stdout", "stderr", "error_log", "temp_dir"},
+            "exit_code": int
+        }
+    """
+    registration = config.registration
+    temp_dir = tempfile.mkdtemp(prefix="voiptest_sipp_")
+    temp_path = Path(temp_dir)
+
+    try:
+        csv_file = temp_path / "accounts.csv"
+        with profiling.span("write_csv"):
+            pool_size = generate_register_csv_file(csv_file, config)
+        count = registration.count or pool_size
+        if pool_size == 0:
+            return {
+                "registration": None,
+                "reason": f"Account pool is empty: {registration.pool}",
+                "logs": {"temp_dir": temp_dir},
+                "exit_code": -1,
+            }
+
+        scenario_file = SCENARIO_DIR / "uac_register.xml"
+        stat_file = temp_path / "stats.csv"
+        err_log = temp_path / "errors.log"
+
+        sip_port = find_free_port(config.target.transport)
+        media_port = find_free_port("udp", span=4)
+
+        # Whole storm: time to start every registration plus the last one's timeout
+        storm_timeout = int(count / registration.rate) + registration.timeout_s + 10
+
+        cmd = [
+            "sipp",
+            config.target.host,
+            "-i", "127.0.0.1",
+            "-p", str(sip_port),
+            "-mp", str(media_port),
+            "-sf", str(scenario_file),
+            "-inf", str(csv_file),
+            "-m", str(count),
+            "-r", f"{registration.rate:g}",
+            "-rp", "1000",
+            "-recv_timeout", str(registration.timeout_s * 1000),
+            "-timeout", str(storm_timeout),
+            "-trace_stat",
+            "-stf", str(stat_file),
+            "-trace_rtt",
+            "-rtt_freq", "1",
+            "-trace_err",
+            "-error_file", str(err_log),
+            "-nd",
+        ]
+        if registration.max_concurrent is not None:
+            cmd.extend(["-l", str(registration.max_concurrent)])
+        cmd.extend(transport_args(config))
+        cmd.extend(["-rsa", f"{config.target.host}:{config.target.port}"])
+
+        capture = start_capture(config, capture_file, sip_port) if capture_file else None
+        try:
+            result = run_process(cmd, cwd=temp_dir, timeout=storm_timeout + 10)
+        finally:
+            if capture is not None:
+                stop_capture(capture)
+
+        with profiling.span("parse_logs"):
+            error_log = err_log.read_text() if err_log.exists() else ""
+            succeeded, failed = parse_stat_counts(stat_file)
+            # -trace_rtt names its file <scenario>_<pid>_rtt.csv in the working directory
+            latencies = []
+            for rtt_file in temp_path.glob("*_rtt.csv"):
+                latencies.extend(parse_rtt_file(rtt_file))
+
+        summary = summarize_registrations(count, succeeded, failed, latencies)
+
+        reason = "success"
+        if result.returncode != 0:
+            reason = f"{summary['failed']} of {count} registrations failed"
+            if summary["unfinished"]:
+                reason += f", {summary['unfinished']} did not finish"
+
+        return {
+            "registration": summary,
+            "reason": reason,
+            "logs": {
+                "stdout": result.stdout,
+                "stderr": result.stderr,
+                "error_log": error_log,
+                "temp_dir": temp_dir,
+            },
+            "exit_code": result.returncode,
+        }
+
+    except subprocess.TimeoutExpired:
+        return {
+            "registration": None,
+            "reason": "SIPp process timeout",
+            "logs": {"temp_dir": temp_dir},
+            "exit_code": -1,
+        }
+    except Exception as e:
+        return {
+            "registration": None,
+            "reason": f"SIPp execution error: {str(e)}",
+            "logs": {"temp_dir": temp_dir},
+            "exit_code": -1,
+        }
+
+
+def parse_stat_counts(stat_file: Path) -> Tuple[int, int]:
+    """Read cumulative successful/failed call counts from a SIPp -trace_stat file.
+
+    Args:
+        stat_file: Statistics CSV written with -stf
+
+    Returns:
+        Tuple of (successful, failed); (0, 0) if the file is missing
+    """
+    if not stat_file.exists():
+        return 0, 0
+
+    lines = [line for line in stat_file.read_text().splitlines() if line.strip()]
+    if len(lines) < 2:
+        return 0, 0
+
+    header = lines[0].split(";")
+    last = lines[-1].split(";")
+    columns = dict(zip(header, last))
+
+    def count(name: str) -> int:
+        try:
+            return int(columns.get(name, "0"))
+        except ValueError:
+            return 0
+
+    return count("SuccessfulCall(C)"), count("FailedCall(C)")
+
+
+def parse_rtt_file(rtt_file: Path) -> List[float]:
+    """Read per-registration response times from a SIPp -trace_rtt file.
+
+    Args:
+        rtt_file: File with "Date_ms;response_time_ms;rtd_no" rows
+
+    Returns:
+        Response times in milliseconds
+    """
+    latencies = []
+    for line in rtt_file.read_text().splitlines():
+        fields = line.split(";")
+        if len(fields) < 2:
+            continue
+        try:
+            latencies.append(float(fields[1]))
+        except ValueError:
+            continue  # Header row
+    return latencies
+
+
+def summarize_registrations(
+    attempted: int, succeeded: int, failed: int, latencies: List[float]
+) -> Dict[str, Any]:
+    """Summarize REGISTER storm counts and latency percentiles.
+
+    Args:
+        attempted: Registrations started
+        succeeded: Registrations that reached 200 OK
+        failed: Registrations SIPp counted as failed
+        latencies: Registration latencies in milliseconds
+
+    Returns:
+        Registration summary dictionary (see execute_registration)
+    """
+    latency = None
+    if latencies:
+        latency = {
+            "min": round(min(latencies), 3),
+            "mean": round(sum(latencies) / len(latencies), 3),
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(max(latencies), 3),
+        }
+
+    return {
+        "attempted": attempted,
+        "succeeded": succeeded,
+        "failed": failed,
+        "unfinished": max(attempted - succeeded - failed, 0),
+        "success_pct": round(100.0 * succeeded / attempted, 3) if attempted else 0.0,
+        "latency_ms": latency,
+    }
+
+
+def find_free_port(transport: str = "udp", span: int = 1, host: str = "127.0.0.1") -> int:
+    """Find a local port (or run of ``span`` consecutive ports) that is free.
+
+    SIPp binds its SIP port and, for media, the -mp port plus the ports
+    right after it, so parallel SIPp processes on one host need distinct
+    ports instead of fixed defaults. The port is released before SIPp
+    binds it, so a concurrent process may still race for it.
+
+    Args:
+        transport: "udp", "tcp" or "tls"
+        span: Number of consecutive ports that must be free
+        host: Local address to probe
+
+    Returns:
+        First port of the free run
+    """
+    kind = socket.SOCK_DGRAM if transport.lower() == "udp" else socket.SOCK_STREAM
+
+    for _ in range(50):
+        with socket.socket(socket.AF_INET, kind) as probe:
+            probe.bind((host, 0))
+            port = probe.getsockname()[1]
+        if port + span > 65536:
+            continue
+
+        probes = []
+        try:
+            for offset in range(span):
+                sock = socket.socket(socket.AF_INET, kind)
+                probes.append(sock)
+                sock.bind((host, port + offset))
+            return port
+        except OSError:
+            continue
+        finally:
+            for sock in probes:
+                sock.close()
+
+    raise RuntimeError("No free local port range found")
+
+
+def transport_args(config: VoipTestConfig) -> List[str]:
+    """Return SIPp transport arguments for the target's transport."""
+    if config.target.transport.lower() == "tcp":
+        return ["-t", "t1"]
+    elif config.target.transport.lower() == "tls":
+        return ["-t", "l1"]
+    return []
+
+
 def resolve_destination(config: VoipTestConfig, dest_key: str) -> str:
     """Resolve a destination (account key or literal) to a username.
     
@@ -258,29 +710,114 @@ def resolve_destination(config: VoipTestConfig, dest_key: str) -> str:
     return dest_key
 
 
-def generate_csv_file(csv_path: Path, config: VoipTestConfig) -> None:
+def talk_time_s(config: VoipTestConfig) -> float:
+    """Return the time a call is held up after the answer (media or flow steps)."""
+    if config.flow is not None:
+        return flow.flow_duration_s(config.flow)
+    return config.media.talk_time_s if config.media is not None else 0
+
+
+def generate_csv_file(
+    csv_path: Path, config: VoipTestConfig, rtp_port: Optional[int] = None
+) -> int:
     """Generate CSV injection file for SIPp.
 
+    When ``call.from`` names an account pool, one row is written per pool
+    account and the pool's injection mode (SEQUENTIAL, RANDOM or USER)
+    decides which row SIPp uses for each call.
+
     Format:
-    First line: SEQUENTIAL
-    Second line: to;from_user;domain;password
+    First line: SEQUENTIAL | RANDOM | USER
+    Data lines: to;from_user;domain;password[;rtp_ip;rtp_port]
+
+    Returns:
+        Number of caller rows written (the number of calls to place)
     """
-    # Resolve caller and destination
-    from_account = config.accounts.caller
-    from_user = from_account.username
-    
+    # Resolve callers: a pool, or the single caller account
+    pool = config.pools.get(config.call.from_)
+    if pool is not None:
+        mode = pool.mode
+        callers = pool.iter_accounts()
+    else:
+        mode = "SEQUENTIAL"
+        callers = [config.accounts.caller]
+
     # Resolve 'to' - can be account key or literal
     to_user = resolve_destination(config, config.call.to)
-    
+
     domain = config.target.domain or config.target.host
-    password = from_account.password or ""
+    media_fields = [config.media.local_ip, rtp_port] if rtp_port is not None else []
 
+    written = 0
     with open(csv_path, "w", newline="") as f:
         writer = csv.writer(f, delimiter=";")
         # First line must be SEQUENTIAL, RANDOM, or USER
-        f.write("SEQUENTIAL\n")
-        # Write data row (no header for field names)
-        writer.writerow([to_user, from_user, domain, password])
+        f.write(f"{mode}\n")
+        # Write data rows (no header for field names)
+        for from_account in callers:
+            row = [to_user, from_account.username, domain, from_account.password or ""]
+            writer.writerow(row + media_fields)
+            written += 1
+
+    return written
+
+
+def generate_register_csv_file(csv_path: Path, config: VoipTestConfig) -> int:
+    """Generate the CSV injection file for a REGISTER storm.
+
+    Format:
+    First line: pool mode (SEQUENTIAL | RANDOM | USER)
+    Data lines: user;domain;password;expires
+
+    Returns:
+        Number of accounts written
+    """
+    registration = config.registration
+    pool = config.pools[registration.pool]
+    domain = config.target.domain or config.target.host
+
+    written = 0
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.writer(f, delimiter=";")
+        f.write(f"{pool.mode}\n")
+        for account in pool.iter_accounts():
+            writer.writerow([account.username, domain, account.password, registration.expires])
+            written += 1
+
+    return written
+
+
+def analyze_media(packets: RtpPackets, config: VoipTestConfig) -> Dict[str, Any]:
+    """Compute quality metrics for the RTP stream returned by the target.
+
+    Args:
+        packets: RtpPackets collected during the call
+        config: Test configuration with media settings
+
+    Returns:
+        Media quality dictionary (see voiptest.media.quality.analyze_packets)
+    """
+    # NumPy is only needed for tests with media
+    from voiptest.media import quality
+
+    return quality.analyze_packets(packets, config.media.clock_rate)
+
+
+def extract_answer_time(message_log: str) -> Optional[float]:
+    """Extract the time from first INVITE to its 2xx answer from a message log.
+
+    Args:
+        message_log: SIPp message log content
+
+    Returns:
+        Answer time in seconds, or None if the call was not answered or the
+        log has no timestamps
+    """
+    for dialog in build_dialogs(parse_message_log(message_log)):
+        summary = summarize_dialog(dialog)
+        if summary["method"] == "INVITE":
+            return summary["answer_time_s"]
+    return None
 
 
 def extract_final_sip_code(message_log: str) -> Optional[int]:
@@ -309,6 +846,27 @@ def extract_final_sip_code(message_log: str) -> Optional[int]:
     return final_code
 
 
+def extract_pool_final_code(message_log: str) -> Optional[int]:
+    """Extract the final SIP code of a run that placed several calls.
+
+    Args:
+        message_log: SIPp message log content
+
+    Returns:
+        The first failing call's final code, so one answered call cannot
+        hide the others; otherwise the last call's code (None without calls)
+    """
+    codes = [
+        summary["final_sip_code"]
+        for summary in map(summarize_dialog, build_dialogs(parse_message_log(message_log)))
+        if summary["method"] == "INVITE"
+    ]
+    for code in codes:
+        if code is None or not 200 <= code < 300:
+            return code
+    return codes[-1] if codes else None
+
+
 def determine_outcome(sipp_result: Dict[str, Any], config: VoipTestConfig) -> str:
     """Determine call outcome from SIPp results.
 
@@ -328,13 +886,9 @@ def determine_outcome(sipp_result: Dict[str, Any], config: VoipTestConfig) -> st
         return "no_answer"
 
     # Check SIP response code
-    if final_code:
-        if 200 <= final_code < 300:
-            return "answered"
-        elif final_code == 486:  # Busy Here
-            return "busy"
-        elif 400 <= final_code < 700:
-            return "failed"
+    outcome = expectations.outcome_for_sip_code(final_code)
+    if outcome is not None:
+        return outcome
 
     # Check exit code
     if exit_code == 0:
@@ -356,40 +910,116 @@ def check_expectations(
     Returns:
         True if expectations are met, False otherwise
     """
-    expect = config.expect
-    final_code = actual["sip_code"]
-    actual_outcome = actual["outcome"]
-
-    # Outcome-based expectations
-    if expect.outcome == "answered":
-        # Must receive 200 OK
-        if actual_outcome != "answered" or final_code != 200:
-            return False
-    elif expect.outcome == "busy":
-        # Must receive 486 Busy or similar
-        if actual_outcome != "busy" or final_code != 486:
-            return False
-    elif expect.outcome == "failed":
-        # Must NOT be success/answered, and must be a failure
-        if actual_outcome == "answered":
-            return False
-        # If final_sip_code is specified, enforce it
-        if expect.final_sip_code is not None and final_code != expect.final_sip_code:
-            return False
-    elif expect.outcome == "no_answer":
-        # Timeout or no response
-        if actual_outcome not in ("no_answer", "failed"):
-            return False
-
-    # Check final SIP code if specified (overrides outcome logic for verification)
-    if expect.final_sip_code is not None:
-        if final_code != expect.final_sip_code:
-            return False
-
-    # Additional checks could be added for answer_within_s, min_duration_s
-    # These would require parsing timing information from SIPp logs
-
-    return True
+    return expectations.check_expectations(config.expect, actual)
+
+
+def run_process(cmd: List[str], cwd: str, timeout: float) -> subprocess.CompletedProcess:
+    """Run SIPp like subprocess.run, tracing spawn and wait as separate spans.
+
+    Args:
+        cmd: Command line
+        cwd: Working directory
+        timeout: Seconds to wait before killing the process
+
+    Returns:
+        CompletedProcess with text stdout/stderr
+
+    Raises:
+        subprocess.TimeoutExpired: If the process outlives the timeout
+    """
+    with profiling.span("sipp_spawn"):
+        proc = subprocess.Popen(
+            cmd,
+            cwd=cwd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+
+    # Time spent here is SIPp talking to the target
+    with profiling.span("sipp_wait"):
+        try:
+            stdout, stderr = proc.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.communicate()
+            raise
+
+    return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
+
+
+def safe_filename(name: str) -> str:
+    """Turn a test case name into a file name."""
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", name).strip("_") or "case"
+
+
+def start_capture(
+    config: VoipTestConfig,
+    capture_file: Path,
+    sip_port: int,
+    media_port: Optional[int] = None,
+    rtp_port: Optional[int] = None,
+) -> Optional[subprocess.Popen]:
+    """Start tcpdump recording one case's traffic.
+
+    The filter is limited to the case's own local ports, so cases running
+    concurrently against the same target (``--jobs``) do not end up in
+    each other's captures.
+
+    Args:
+        config: Test configuration
+        capture_file: Output pcap path
+        sip_port: Local SIP port of the case's SIPp process
+        media_port: First of the four SIPp media ports (-mp), if any
+        rtp_port: RTP receiver port to include in the capture, if any
+
+    Returns:
+        The tcpdump process, or None if tcpdump is not available
+    """
+    if shutil.which("tcpdump") is None:
+        return None
+
+    capture_filter = capture_filter_for(config, sip_port, media_port, rtp_port)
+
+    capture_file.parent.mkdir(parents=True, exist_ok=True)
+    proc = subprocess.Popen(
+        ["tcpdump", "-i", "any", "-U", "-n", "-w", str(capture_file), capture_filter],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+    # tcpdump creates the file once it is listening
+    deadline = time.time() + 2.0
+    while not capture_file.exists() and proc.poll() is None and time.time() < deadline:
+        time.sleep(0.05)
+
+    return proc
+
+
+def capture_filter_for(
+    config: VoipTestConfig,
+    sip_port: int,
+    media_port: Optional[int] = None,
+    rtp_port: Optional[int] = None,
+) -> str:
+    """Build the tcpdump filter for one case (see start_capture)."""
+    clauses = [f"(host {config.target.host} and port {sip_port})"]
+    if media_port is not None:
+        clauses.append(f"(udp and portrange {media_port}-{media_port + 3})")
+    if rtp_port is not None:
+        clauses.append(f"(udp and port {rtp_port})")
+    return " or ".join(clauses)
+
+
+def stop_capture(proc: subprocess.Popen) -> None:
+    """Stop a tcpdump process started by start_capture, flushing its output."""
+    if proc.poll() is None:
+        proc.terminate()
+    try:
+        proc.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
 
 
 def validate_sipp_installed() -> bool:
@@ -401,8 +1031,9 @@ def validate_sipp_installed() -> bool:
     return shutil.which("sipp") is not None
 
 
+@functools.lru_cache(maxsize=None)
 def get_sipp_version() -> str:
-    """Get installed SIPp version.
+    """Get installed SIPp version (cached for the life of the process).
 
     Returns:
         SIPp version string or "unknown"
@@ -0,0 +1,250 @@
+"""Render compiled call flows as SIPp scenario XML, with a disk cache.
+
+Rendered scenarios are stored under ``$XDG_CACHE_HOME/voiptest/scenarios``
+(``~/.cache/...`` by default) as ``<sha256>.xml``, keyed by the compiled
+flow and ``RENDERER_VERSION``. Matrix cases, targets and repeated runs that
+share a flow reuse one file; within a process the path is also memoized.
+Files are written to a temporary name and renamed, so concurrent runs never
+read a partial scenario.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from voiptest import profiling
+from voiptest.flow import (
+    CompiledFlow,
+    ExpectRequest,
+    ExpectResponse,
+    Label,
+    Operation,
+    Pause,
+    PlayMedia,
+    SendRequest,
+    SendResponse,
+)
+
+# Bump when the rendered XML changes for the same compiled flow
+RENDERER_VERSION = 2
+
+_memo: Dict[CompiledFlow, Path] = {}
+_memo_lock = threading.Lock()
+
+
+def cache_dir() -> Path:
+    """Directory holding rendered scenarios."""
+    base = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(base) / "voiptest" / "scenarios"
+
+
+def scenario_key(compiled: CompiledFlow) -> str:
+    """Content hash identifying the rendered scenario of a compiled flow."""
+    # Frozen dataclasses of strings, numbers and tuples have a stable repr
+    content = f"{RENDERER_VERSION}\n{compiled!r}"
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def _sdp(direction: str, media: bool, version: int) -> List[str]:
+    # With media, the far end sends to voiptest's RTP receiver (field4/field5)
+    address = "IN IP4 [field4]" if media else "IN IP[media_ip_type] [media_ip]"
+    port = "[field5]" if media else "[media_port]"
+    return [
+        "v=0",
+        f"o=[field1] 53655765 {2353687637 + version} IN IP[local_ip_type] [local_ip]",
+        "s=-",
+        f"c={address}",
+        "t=0 0",
+        f"m=audio {port} RTP/AVP 0 8 101",
+        "a=rtpmap:0 PCMU/8000",
+        "a=rtpmap:8 PCMA/8000",
+        "a=rtpmap:101 telephone-event/8000",
+        "a=fmtp:101 0-16",
+        f"a={direction}",
+    ]
+
+
+def _cdata(lines: List[str]) -> str:
+    body = "\n".join(f"      {line}" if line else "" for line in lines)
+    return f"<![CDATA[\n{body}\n  ]]>"
+
+
+def _render_request(op: SendRequest, media: bool, sdp_version: int) -> str:
+    if op.in_dialog:
+        request_uri = "sip:[field0]@[remote_ip]:[remote_port]"
+        to_header = "To: <sip:[field0]@[field2]>[peer_tag_param]"
+    else:
+        request_uri = "sip:[field0]@[field2]"
+        to_header = "To: <sip:[field0]@[field2]>"
+
+    lines = [
+        f"{op.method} {request_uri} SIP/2.0",
+        "Via: SIP/2.0/[transport] [local_ip]:[local_port];branch=[branch]",
+        "From: <sip:[field1]@[field2]>;tag=[pid]SIPpTag00[call_number]",
+        to_header,
+        "Call-ID: [call_id]",
+        f"CSeq: {op.cseq} {op.method}",
+    ]
+    if op.method != "BYE":
+        lines.append("Contact: <sip:[field1]@[local_ip]:[local_port];transport=[transport]>")
+    lines.append("Max-Forwards: 70")
+    if op.method == "INVITE" and not op.in_dialog:
+        lines.append("Subject: VoIP Test Call")
+    if op.refer_to is not None:
+        lines.append(f"Refer-To: <sip:{op.refer_to}@[field2]>")
+        lines.append("Referred-By: <sip:[field1]@[field2]>")
+
+    body: List[str] = []
+    if op.sdp is not None:
+        lines.append("Content-Type: application/sdp")
+        body = _sdp(op.sdp, media, sdp_version)
+    elif op.body is not None:
+        lines.append(f"Content-Type: {op.content_type}")
+        body = op.body.rstrip("\r\n").split("\r\n")
+    if op.auth:
+        lines.append('[authentication username="[field1]" password="[field3]"]')
+    lines.append("Content-Length: [len]" if body else "Content-Length: 0")
+    if body:
+        lines.append("")
+        lines.extend(body)
+
+    # ACK is not retransmitted by the UAC
+    retrans = "" if op.method == "ACK" else ' retrans="500"'
+    return f"  <send{retrans}>{_cdata(lines)}</send>"
+
+
+def _render_response(op: SendResponse) -> str:
+    lines = [
+        f"SIP/2.0 {op.code} {op.reason}",
+        "[last_Via:]",
+        "[last_From:]",
+        "[last_To:]",
+        "[last_Call-ID:]",
+        "[last_CSeq:]",
+        "Contact: <sip:[field1]@[local_ip]:[local_port];transport=[transport]>",
+        "Content-Length: 0",
+    ]
+    next_label = f' next="{op.next}"' if op.next is not None else ""
+    return f"  <send{next_label}>{_cdata(lines)}</send>"
+
+
+def _render_expect(op: Operation) -> str:
+    if isinstance(op, ExpectResponse):
+        attrs = [f'response="{op.code}"']
+        if op.challenge:
+            attrs.append('auth="true"')
+        if op.optional:
+            attrs.append('optional="true"')
+    else:
+        attrs = [f'request="{op.method}"']
+    if op.timeout_ms is not None:
+        attrs.append(f'timeout="{op.timeout_ms}"')
+    if isinstance(op, ExpectRequest) and op.on_timeout is not None:
+        attrs.append(f'ontimeout="{op.on_timeout}"')
+    return f"  <recv {' '.join(attrs)}/>"
+
+
+def render_scenario(compiled: CompiledFlow, name: str = "Compiled Call Flow") -> str:
+    """Render a compiled flow as SIPp scenario XML.
+
+    Args:
+        compiled: Compiled flow
+        name: Scenario name attribute
+
+    Returns:
+        Scenario XML text
+    """
+    fields = "to, from_user, domain, password"
+    if compiled.media:
+        fields += ", rtp_ip, rtp_port"
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8" ?>',
+        '<!DOCTYPE scenario SYSTEM "sipp.dtd">',
+        "",
+        f"<!-- Generated by voiptest from a flow: section; CSV fields: {fields} -->",
+        f'<scenario name="{name}">',
+    ]
+
+    sdp_version = 0
+    for op in compiled.operations:
+        if isinstance(op, SendRequest):
+            if op.sdp is not None and op.in_dialog:
+                sdp_version += 1
+            parts.append(_render_request(op, compiled.media, sdp_version))
+        elif isinstance(op, SendResponse):
+            parts.append(_render_response(op))
+        elif isinstance(op, (ExpectResponse, ExpectRequest)):
+            parts.append(_render_expect(op))
+        elif isinstance(op, Label):
+            parts.append(f'  <label id="{op.name}"/>')
+        elif isinstance(op, Pause):
+            parts.append(f'  <pause milliseconds="{op.milliseconds}"/>')
+        elif isinstance(op, PlayMedia):
+            parts.append(
+                '  <nop>\n    <action>\n      <exec play_pcap_audio="media.pcap"/>\n'
+                "    </action>\n  </nop>"
+            )
+
+    parts.extend([
+        '  <nop action="exit"/>',
+        "",
+        '  <ResponseTimeRepartition value="10, 20, 30, 40, 50, 100, 150, 200"/>',
+        '  <CallLengthRepartition value="10, 50, 100, 500, 1000, 5000, 10000"/>',
+        "",
+        "</scenario>",
+        "",
+    ])
+    return "\n".join(parts)
+
+
+def _write_atomic(path: Path, content: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=".tmp-", suffix=".xml", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+
+def scenario_file(compiled: CompiledFlow, fallback_dir: Optional[Path] = None) -> Path:
+    """Return the path of the rendered scenario, rendering it on a cache miss.
+
+    Args:
+        compiled: Compiled flow
+        fallback_dir: Where to write the scenario if the cache directory is
+                      not writable
+
+    Returns:
+        Path to the scenario XML file
+    """
+    with _memo_lock:
+        cached = _memo.get(compiled)
+    if cached is not None and cached.exists():
+        return cached
+
+    key = scenario_key(compiled)
+    path = cache_dir() / f"{key}.xml"
+    if not path.exists():
+        with profiling.span("render_scenario", key=key[:12]):
+            content = render_scenario(compiled)
+        try:
+            _write_atomic(path, content)
+        except OSError:
+            if fallback_dir is None:
+                raise
+            path = Path(fallback_dir) / f"{key}.xml"
+            path.write_text(content, encoding="utf-8")
+            return path
+
+    with _memo_lock:
+        _memo[compiled] = path
+    return path
@@ -0,0 +1,161 @@
+"""Engine-independent evaluation of ``Expect`` rules.
+
+Live runs (SIPp) and offline capture analysis both reduce a call to an
+``actual`` dictionary and check it here, so the same YAML assertions
+apply to both.
+"""
+
+from typing import Any, Dict, Optional
+
+from voiptest.config import Expect
+
+
+def outcome_for_sip_code(final_code: Optional[int]) -> Optional[str]:
+    """Map a final SIP response code to a call outcome.
+
+    Args:
+        final_code: Final SIP response code, or None
+
+    Returns:
+        "answered", "busy" or "failed", or None if the code does not
+        decide the outcome (no code, provisional or redirect)
+    """
+    if final_code:
+        if 200 <= final_code < 300:
+            return "answered"
+        elif final_code == 486:  # Busy Here
+            return "busy"
+        elif 400 <= final_code < 700:
+            return "failed"
+    return None
+
+
+def check_expectations(expect: Expect, actual: Dict[str, Any]) -> bool:
+    """Check if actual results match expected outcomes.
+
+    Args:
+        expect: Expected outcome
+        actual: Actual outcomes with at least "outcome" and "sip_code";
+                "answer_time_s", "call_duration_s", "media" and
+                "registration" are checked when present
+
+    Returns:
+        True if expectations are met, False otherwise
+    """
+    final_code = actual["sip_code"]
+    actual_outcome = actual["outcome"]
+
+    # Outcome-based expectations
+    if expect.outcome == "answered":
+        # Must receive 200 OK
+        if actual_outcome != "answered" or final_code != 200:
+            return False
+    elif expect.outcome == "busy":
+        # Must receive 486 Busy or similar
+        if actual_outcome != "busy" or final_code != 486:
+            return False
+    elif expect.outcome == "failed":
+        # Must NOT be success/answered, and must be a failure
+        if actual_outcome == "answered":
+            return False
+        # If final_sip_code is specified, enforce it
+        if expect.final_sip_code is not None and final_code != expect.final_sip_code:
+            return False
+    elif expect.outcome == "no_answer":
+        # Timeout or no response
+        if actual_outcome not in ("no_answer", "failed"):
+            return False
+
+    # Check final SIP code if specified (overrides outcome logic for verification)
+    if expect.final_sip_code is not None:
+        if final_code != expect.final_sip_code:
+            return False
+
+    # Timing expectations are only enforced when the timing was measured
+    answer_time = actual.get("answer_time_s")
+    if expect.answer_within_s is not None and answer_time is not None:
+        if answer_time > expect.answer_within_s:
+            return False
+
+    call_duration = actual.get("call_duration_s")
+    if expect.min_duration_s is not None and call_duration is not None:
+        if call_duration < expect.min_duration_s:
+            return False
+
+    # Media quality expectations
+    if not check_media_expectations(expect, actual.get("media")):
+        return False
+
+    # REGISTER storm expectations
+    if "registration" in actual:
+        if not check_registration_expectations(expect, actual["registration"]):
+            return False
+
+    return True
+
+
+def check_media_expectations(expect: Expect, media: Optional[Dict[str, Any]]) -> bool:
+    """Check RTP quality metrics against media expectations.
+
+    Args:
+        expect: Expected outcome
+        media: Media quality dictionary, or None if no media was measured
+
+    Returns:
+        True if all configured media expectations are met
+    """
+    limits = (
+        expect.max_jitter_ms,
+        expect.max_loss_pct,
+        expect.max_reorder_pct,
+        expect.min_mos,
+    )
+    if all(limit is None for limit in limits):
+        return True
+
+    # Media expectations without measured media cannot pass
+    if not media or media["packets"] == 0:
+        return False
+
+    if expect.max_jitter_ms is not None and media["jitter_ms"] > expect.max_jitter_ms:
+        return False
+    if expect.max_loss_pct is not None and media["loss_pct"] > expect.max_loss_pct:
+        return False
+    if expect.max_reorder_pct is not None and media["reorder_pct"] > expect.max_reorder_pct:
+        return False
+    if expect.min_mos is not None and media["mos"] < expect.min_mos:
+        return False
+
+    return True
+
+
+def check_registration_expectations(
+    expect: Expect, registration: Optional[Dict[str, Any]]
+) -> bool:
+    """Check REGISTER storm results against registration expectations.
+
+    Without an explicit ``min_register_success_pct`` every registration
+    must succeed.
+
+    Args:
+        expect: Expected outcome
+        registration: Registration summary, or None if the storm did not run
+
+    Returns:
+        True if all registration expectations are met
+    """
+    if not registration:
+        return False
+
+    min_success = expect.min_register_success_pct
+    if min_success is None:
+        min_success = 100.0
+    if registration["success_pct"] < min_success:
+        return False
+
+    if expect.max_register_p95_ms is not None:
+        latency = registration.get("latency_ms")
+        if latency is None or latency["p95"] > expect.max_register_p95_ms:
+            return False
+
+    return True
@@ -0,0 +1,241 @@
+"""Compile YAML call flows into an engine-independent message sequence.
+
+A call flow is the fixed call setup (INVITE, digest challenge, re-INVITE
+with credentials, ACK), the ``flow:`` steps, and a BYE unless the far end
+hung up. After a blind transfer the far end normally hangs up our leg, so
+its BYE is awaited briefly before sending our own. ``compile_flow`` reduces
+it to a tuple of frozen operations that an engine renders into its own
+format (``voiptest.engines.sipp_flow`` writes SIPp scenario XML). The
+result is hashable and compares by value, so it also serves as the cache
+key for rendered scenarios.
+"""
+
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence, Tuple, Union
+
+from voiptest.config import (
+    DtmfStep,
+    HoldStep,
+    ReinviteStep,
+    TalkStep,
+    TransferStep,
+    VoipTestConfig,
+    WaitStep,
+)
+
+# Timeout for responses to in-dialog requests (ms)
+RESPONSE_TIMEOUT_MS = 5000
+
+
+@dataclass(frozen=True)
+class SendRequest:
+    """Send a request in the call's dialog."""
+
+    method: str
+    cseq: int
+    # SDP media direction; None sends no SDP body
+    sdp: Optional[str] = None
+    # REFER target user part, in the call's domain
+    refer_to: Optional[str] = None
+    content_type: Optional[str] = None
+    body: Optional[str] = None
+    # Add digest credentials from the last challenge
+    auth: bool = False
+    # False for the initial INVITEs (no To tag yet)
+    in_dialog: bool = True
+
+
+@dataclass(frozen=True)
+class ExpectResponse:
+    """Wait for a response; optional responses may be skipped."""
+
+    code: int
+    optional: bool = False
+    timeout_ms: Optional[int] = None
+    # Store the digest challenge for the next authenticated request
+    challenge: bool = False
+
+
+@dataclass(frozen=True)
+class ExpectRequest:
+    """Wait for a request from the far end."""
+
+    method: str
+    timeout_ms: Optional[int] = None
+    # Label to continue at if the request does not arrive (otherwise a failure)
+    on_timeout: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class SendResponse:
+    """Answer the last received request."""
+
+    code: int
+    reason: str
+    # Label to continue at afterwards (otherwise the next operation)
+    next: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class Label:
+    """Jump target for ``on_timeout`` / ``next``."""
+
+    name: str
+
+
+@dataclass(frozen=True)
+class Pause:
+    """Keep the call in its current state."""
+
+    milliseconds: int
+
+
+@dataclass(frozen=True)
+class PlayMedia:
+    """Start playing the configured RTP stream towards the far end."""
+
+
+Operation = Union[
+    SendRequest, ExpectResponse, ExpectRequest, SendResponse, Label, Pause, PlayMedia
+]
+
+
+@dataclass(frozen=True)
+class CompiledFlow:
+    """A compiled call flow.
+
+    ``media`` selects the SDP address: voiptest's RTP receiver (taken from
+    the injection file) rather than the engine's own media ports.
+    """
+
+    media: bool
+    operations: Tuple[Operation, ...]
+
+
+def _invite_setup(answer_timeout_ms: int) -> List[Operation]:
+    # Same sequence as the static uac_basic.xml scenario
+    return [
+        SendRequest("INVITE", 1, sdp="sendrecv", in_dialog=False),
+        ExpectResponse(401, challenge=True),
+        SendRequest("ACK", 1),
+        SendRequest("INVITE", 2, sdp="sendrecv", auth=True, in_dialog=False),
+        ExpectResponse(100, optional=True),
+        ExpectResponse(180, optional=True),
+        ExpectResponse(183, optional=True),
+        ExpectResponse(200, timeout_ms=answer_timeout_ms),
+        SendRequest("ACK", 2),
+    ]
+
+
+def compile_flow(
+    config: VoipTestConfig,
+    resolve_destination: Callable[[str], str] = str,
+) -> CompiledFlow:
+    """Compile a call test's flow steps.
+
+    Args:
+        config: Call test configuration (``flow`` may be empty)
+        resolve_destination: Maps a transfer target (account key or
+                             literal) to a user part
+
+    Returns:
+        Compiled flow
+    """
+    operations = _invite_setup(config.call.timeout_s * 1000)
+    if config.media is not None:
+        operations.append(PlayMedia())
+
+    cseq = 2
+    call_up = True
+    transferred = False
+
+    def reinvite(direction: str) -> List[Operation]:
+        nonlocal cseq
+        cseq += 1
+        return [
+            SendRequest("INVITE", cseq, sdp=direction),
+            ExpectResponse(100, optional=True),
+            ExpectResponse(200, timeout_ms=RESPONSE_TIMEOUT_MS),
+            SendRequest("ACK", cseq),
+        ]
+
+    for step in config.flow or []:
+        if isinstance(step, TalkStep):
+            operations.append(Pause(int(step.duration_s * 1000)))
+
+        elif isinstance(step, DtmfStep):
+            for index, digit in enumerate(step.digits):
+                cseq += 1
+                operations.append(SendRequest(
+                    "INFO",
+                    cseq,
+                    content_type="application/dtmf-relay",
+                    body=f"Signal={digit}\r\nDuration={step.duration_ms}\r\n",
+                ))
+                operations.append(ExpectResponse(200, timeout_ms=RESPONSE_TIMEOUT_MS))
+                if step.interval_ms and index < len(step.digits) - 1:
+                    operations.append(Pause(step.interval_ms))
+
+        elif isinstance(step, HoldStep):
+            operations.extend(reinvite("sendonly"))
+            operations.append(Pause(int(step.duration_s * 1000)))
+            operations.extend(reinvite("sendrecv"))
+
+        elif isinstance(step, ReinviteStep):
+            operations.extend(reinvite(step.direction))
+
+        elif isinstance(step, TransferStep):
+            cseq += 1
+            operations.append(SendRequest("REFER", cseq, refer_to=resolve_destination(step.to)))
+            operations.append(ExpectResponse(202, timeout_ms=RESPONSE_TIMEOUT_MS))
+            for _ in range(step.notifies):
+                operations.append(ExpectRequest("NOTIFY", timeout_ms=RESPONSE_TIMEOUT_MS))
+                operations.append(SendResponse(200, "OK"))
+            transferred = True
+
+        elif isinstance(step, WaitStep):
+            operations.append(ExpectRequest(step.request, timeout_ms=step.timeout_s * 1000))
+            operations.append(SendResponse(200, "OK"))
+            if step.request == "BYE":
+                call_up = False
+
+    if call_up and transferred:
+        # Answer the far end's BYE if it comes, otherwise hang up ourselves
+        operations.append(ExpectRequest("BYE", timeout_ms=RESPONSE_TIMEOUT_MS, on_timeout="1"))
+        operations.append(SendResponse(200, "OK", next="2"))
+        operations.append(Label("1"))
+    if call_up:
+        cseq += 1
+        operations.append(SendRequest("BYE", cseq))
+        operations.append(ExpectResponse(200, timeout_ms=RESPONSE_TIMEOUT_MS))
+    if call_up and transferred:
+        operations.append(Label("2"))
+
+    return CompiledFlow(media=config.media is not None, operations=tuple(operations))
+
+
+def flow_duration_s(steps: Optional[Sequence[object]]) -> float:
+    """Upper bound of the time a flow keeps the call up after the answer.
+
+    Args:
+        steps: Flow steps from the configuration
+
+    Returns:
+        Seconds spent in pauses and waits plus in-dialog response timeouts
+    """
+    total = 0.0
+    for step in steps or []:
+        if isinstance(step, TalkStep):
+            total += step.duration_s
+        elif isinstance(step, DtmfStep):
+            total += len(step.digits) * (step.interval_ms + RESPONSE_TIMEOUT_MS) / 1000.0
+        elif isinstance(step, HoldStep):
+            total += step.duration_s + 2 * RESPONSE_TIMEOUT_MS / 1000.0
+        elif isinstance(step, ReinviteStep):
+            total += RESPONSE_TIMEOUT_MS / 1000.0
+        elif isinstance(step, TransferStep):
+            # REFER, each NOTIFY and the wait for the far end's BYE
+            total += (2 + step.notifies) * RESPONSE_TIMEOUT_MS / 1000.0
+        elif isinstance(step, WaitStep):
+            total += step.timeout_s
+    return total
@@ -0,0 +1,175 @@
+"""SQLite-backed history of test results.
+
+Every case the runner executes is appended as one row, so latency and
+answer-rate drift can be analyzed across runs (see ``voiptest.trends``).
+"""
+
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_HISTORY_PATH = Path(".voiptest") / "history.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    recorded_at REAL NOT NULL,
+    suite TEXT NOT NULL,
+    case_name TEXT NOT NULL,
+    target TEXT NOT NULL,
+    test_type TEXT NOT NULL,
+    passed INTEGER NOT NULL,
+    outcome TEXT,
+    sip_code INTEGER,
+    answered INTEGER NOT NULL,
+    setup_latency_s REAL,
+    duration_s REAL,
+    engine TEXT NOT NULL,
+    engine_version TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_results_series ON results (case_name, target, recorded_at);
+CREATE INDEX IF NOT EXISTS idx_results_run ON results (run_id);
+"""
+
+
+def target_key(target: Dict[str, Any]) -> str:
+    """Format a target config dict as "transport:host:port"."""
+    return f"{target.get('transport', 'udp')}:{target['host']}:{target.get('port', 5060)}"
+
+
+def setup_latency_s(actual: Dict[str, Any]) -> Optional[float]:
+    """Setup latency of a run: answer time for calls, median latency for storms."""
+    registration = actual.get("registration")
+    if registration and registration.get("latency_ms"):
+        return registration["latency_ms"]["p50"] / 1000.0
+    return actual.get("answer_time_s")
+
+
+class HistoryStore:
+    """Append-only store of per-case results.
+
+    One store instance corresponds to one invocation of the tool; all rows
+    it writes share its ``run_id``.
+    """
+
+    def __init__(self, path: Path = DEFAULT_HISTORY_PATH, run_id: Optional[str] = None) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def __enter__(self) -> "HistoryStore":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self._conn.close()
+
+    def record_runs(
+        self,
+        suite: str,
+        runs: List[Dict[str, Any]],
+        engine: str = "sipp",
+        engine_version: Optional[str] = None,
+    ) -> int:
+        """Append the runs of one test file.
+
+        Args:
+            suite: Test file (scenario) name
+            runs: Run result dictionaries from the runner
+            engine: Engine that executed the runs
+            engine_version: Engine version string (a run's own
+                            "engine_version", set by remote workers, wins)
+
+        Returns:
+            Number of rows written (runs without a config are skipped)
+        """
+        now = time.time()
+        rows = []
+        for run in runs:
+            config = run.get("config") or {}
+            if not config.get("target"):
+                continue
+            actual = run.get("actual") or {}
+            outcome = actual.get("outcome")
+
+            rows.append((
+                self.run_id,
+                now,
+                suite,
+                run.get("name", "unknown"),
+                target_key(config["target"]),
+                config.get("type", "call"),
+                int(bool(run.get("passed"))),
+                outcome,
+                actual.get("sip_code"),
+                int(outcome in ("answered", "registered")),
+                setup_latency_s(actual),
+                run.get("duration_s"),
+                engine,
+                run.get("engine_version", engine_version),
+            ))
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                """
+                INSERT INTO results (
+                    run_id, recorded_at, suite, case_name, target, test_type, passed,
+                    outcome, sip_code, answered, setup_latency_s, duration_s,
+                    engine, engine_version
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+        return len(rows)
+
+    def series_keys(self, case_filter: Optional[str] = None) -> List[Tuple[str, str]]:
+        """List distinct (case_name, target) pairs, optionally filtered by name.
+
+        Args:
+            case_filter: Substring that case names must contain
+
+        Returns:
+            Sorted (case_name, target) tuples
+        """
+        query = "SELECT DISTINCT case_name, target FROM results"
+        params: Tuple[Any, ...] = ()
+        if case_filter:
+            query += " WHERE case_name LIKE ?"
+            params = (f"%{case_filter}%",)
+        query += " ORDER BY case_name, target"
+        with self._lock:
+            return [(row[0], row[1]) for row in self._conn.execute(query, params)]
+
+    def latest(self, case_name: str, target: str, limit: int) -> List[sqlite3.Row]:
+        """Return the most recent results for one case/target, newest first.
+
+        Args:
+            case_name: Case name
+            target: Target key ("transport:host:port")
+            limit: Maximum number of rows
+
+        Returns:
+            Result rows ordered by recorded_at descending
+        """
+        with self._lock:
+            return self._conn.execute(
+                """
+                SELECT * FROM results
+                WHERE case_name = ? AND target = ?
+                ORDER BY recorded_at DESC, id DESC
+                LIMIT ?
+                """,
+                (case_name, target, limit),
+            ).fetchall()
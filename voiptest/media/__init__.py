@@ -0,0 +1 @@
+"""RTP media capture and quality analysis."""
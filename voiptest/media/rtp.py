@@ -0,0 +1,128 @@
+"""RTP packet parsing and a native receiver for the return media stream.
+
+Packets are stored column-wise in ``array.array`` buffers so the quality
+analysis can view them as NumPy arrays without copying.
+"""
+
+import socket
+import struct
+import threading
+import time
+from array import array
+from dataclasses import dataclass, field
+from typing import Optional, Tuple
+
+# V/P/X/CC, M/PT, sequence number, timestamp, SSRC
+RTP_HEADER = struct.Struct("!BBHII")
+RTP_VERSION = 2
+
+# Large enough for any RTP packet carried over UDP on a normal MTU
+RECV_BUFFER_SIZE = 2048
+
+
+@dataclass
+class RtpPackets:
+    """Column-oriented store of received RTP packet headers."""
+
+    seq: array = field(default_factory=lambda: array("H"))
+    timestamp: array = field(default_factory=lambda: array("I"))
+    ssrc: array = field(default_factory=lambda: array("I"))
+    payload_type: array = field(default_factory=lambda: array("B"))
+    arrival_s: array = field(default_factory=lambda: array("d"))
+
+    def __len__(self) -> int:
+        return len(self.seq)
+
+    def append(self, header: Tuple[int, int, int, int], arrival_s: float) -> None:
+        """Append one parsed header (payload_type, seq, timestamp, ssrc)."""
+        payload_type, seq, timestamp, ssrc = header
+        self.payload_type.append(payload_type)
+        self.seq.append(seq)
+        self.timestamp.append(timestamp)
+        self.ssrc.append(ssrc)
+        self.arrival_s.append(arrival_s)
+
+
+def parse_rtp_header(data, offset: int = 0) -> Optional[Tuple[int, int, int, int]]:
+    """Parse an RTP fixed header.
+
+    Args:
+        data: Buffer (bytes, bytearray or memoryview) holding the packet
+        offset: Offset of the RTP header within the buffer
+
+    Returns:
+        Tuple of (payload_type, seq, timestamp, ssrc), or None if the
+        buffer does not hold an RTP version 2 packet
+    """
+    if len(data) - offset < RTP_HEADER.size:
+        return None
+
+    first, second, seq, timestamp, ssrc = RTP_HEADER.unpack_from(data, offset)
+    if first >> 6 != RTP_VERSION:
+        return None
+
+    payload_type = second & 0x7F
+    # Payload types 72-76 are RTCP packets sharing the port (RFC 5761)
+    if 72 <= payload_type <= 76:
+        return None
+
+    return payload_type, seq, timestamp, ssrc
+
+
+class RtpReceiver:
+    """Receive RTP on a UDP port in a background thread.
+
+    The socket is bound in ``start()`` so the chosen port can be
+    advertised in SDP before the call is placed.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.host = host
+        self.requested_port = port
+        self.port: Optional[int] = None
+        self.packets = RtpPackets()
+        self._sock: Optional[socket.socket] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self) -> int:
+        """Bind the socket and start receiving.
+
+        Returns:
+            The local port the receiver is bound to
+        """
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.bind((self.host, self.requested_port))
+        self._sock.settimeout(0.2)
+        self.port = self._sock.getsockname()[1]
+
+        self._thread = threading.Thread(target=self._receive_loop, daemon=True)
+        self._thread.start()
+        return self.port
+
+    def stop(self) -> RtpPackets:
+        """Stop receiving and return the collected packets."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._sock is not None:
+            self._sock.close()
+        return self.packets
+
+    def _receive_loop(self) -> None:
+        buf = bytearray(RECV_BUFFER_SIZE)
+        view = memoryview(buf)
+        clock = time.perf_counter
+
+        while not self._stop.is_set():
+            try:
+                size = self._sock.recv_into(buf)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+
+            arrival = clock()
+            header = parse_rtp_header(view[:size])
+            if header is not None:
+                self.packets.append(header, arrival)
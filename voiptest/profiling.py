@@ -0,0 +1,154 @@
+"""Lightweight stage tracing for ``--profile`` runs.
+
+Code marks stages with ``with profiling.span("name"):``. While no
+profiler is active a span costs one global lookup, so instrumentation
+stays in place permanently. An active ``Profiler`` records each span with
+its thread, nesting and self time, writes them as a Chrome trace
+(``chrome://tracing`` / Perfetto) and summarizes the hot spots.
+"""
+
+import cProfile
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+_active: Optional["Profiler"] = None
+
+
+class Profiler:
+    """Collects timing spans, optionally alongside cProfile dumps."""
+
+    def __init__(self, cprofile_dir: Optional[Path] = None) -> None:
+        self.cprofile_dir = Path(cprofile_dir) if cprofile_dir else None
+        self.spans: List[Dict[str, Any]] = []
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def span(self, name: str, /, **args: Any) -> Iterator[None]:
+        """Record the enclosed block as a span named ``name``."""
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+
+        # Children add their duration here so the parent can report self time
+        frame = {"child_s": 0.0}
+        stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            stack.pop()
+            if stack:
+                stack[-1]["child_s"] += duration
+
+            record = {
+                "name": name,
+                "start_s": start - self._origin,
+                "duration_s": duration,
+                "self_s": duration - frame["child_s"],
+                "tid": threading.get_ident(),
+                "args": args,
+            }
+            with self._lock:
+                self.spans.append(record)
+
+    @contextmanager
+    def cprofile(self, label: str) -> Iterator[None]:
+        """Run the enclosed block under cProfile if a dump directory is set.
+
+        Only profiles the calling thread; the dump is ``<cprofile_dir>/<label>.prof``.
+        """
+        if self.cprofile_dir is None:
+            yield
+            return
+
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self.cprofile_dir.mkdir(parents=True, exist_ok=True)
+            profile.dump_stats(str(self.cprofile_dir / f"{label}.prof"))
+
+    def write_chrome_trace(self, path: Path) -> None:
+        """Write spans in Chrome trace event format.
+
+        Args:
+            path: Output JSON path
+        """
+        pid = os.getpid()
+        events = [
+            {
+                "name": record["name"],
+                "cat": "voiptest",
+                "ph": "X",
+                "ts": round(record["start_s"] * 1e6, 3),
+                "dur": round(record["duration_s"] * 1e6, 3),
+                "pid": pid,
+                "tid": record["tid"],
+                "args": record["args"],
+            }
+            for record in self.spans
+        ]
+        Path(path).write_text(
+            json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}, default=str)
+        )
+
+    def summary(self, top: int = 10) -> List[Dict[str, Any]]:
+        """Aggregate spans by name, ordered by total self time.
+
+        Args:
+            top: Number of entries to return
+
+        Returns:
+            List of {"name", "count", "total_s", "self_s", "max_s"}
+        """
+        totals: Dict[str, Dict[str, Any]] = {}
+        for record in self.spans:
+            entry = totals.setdefault(
+                record["name"],
+                {"name": record["name"], "count": 0, "total_s": 0.0, "self_s": 0.0, "max_s": 0.0},
+            )
+            entry["count"] += 1
+            entry["total_s"] += record["duration_s"]
+            entry["self_s"] += record["self_s"]
+            entry["max_s"] = max(entry["max_s"], record["duration_s"])
+
+        ranked = sorted(totals.values(), key=lambda e: e["self_s"], reverse=True)
+        return ranked[:top]
+
+
+def enable(profiler: Profiler) -> None:
+    """Make ``profiler`` the target of all spans."""
+    global _active
+    _active = profiler
+
+
+def disable() -> None:
+    """Stop recording spans."""
+    global _active
+    _active = None
+
+
+def active() -> Optional[Profiler]:
+    """Return the active profiler, if any."""
+    return _active
+
+
+@contextmanager
+def span(name: str, /, **args: Any) -> Iterator[None]:
+    """Record a span on the active profiler; a no-op when profiling is off."""
+    profiler = _active
+    if profiler is None:
+        yield
+        return
+    with profiler.span(name, **args):
+        yield
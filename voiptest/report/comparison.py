@@ -0,0 +1,143 @@
+"""Side-by-side comparison of the same cases run against several targets."""
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from voiptest.history import setup_latency_s
+from voiptest.trends import percentile
+
+
+def _summarize(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    latencies = [
+        latency
+        for latency in (setup_latency_s(run.get("actual") or {}) for run in runs)
+        if latency is not None
+    ]
+    answered = sum(
+        1 for run in runs if (run.get("actual") or {}).get("outcome") in ("answered", "registered")
+    )
+    return {
+        "runs": len(runs),
+        "passed": sum(1 for run in runs if run.get("passed")),
+        "answer_rate": answered / len(runs) if runs else 0.0,
+        "latency_p50_s": percentile(latencies, 50),
+        "latency_p95_s": percentile(latencies, 95),
+    }
+
+
+def compare_targets(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Partition one test file's runs by target and summarize each partition.
+
+    Args:
+        result: Test file result from ``runner.run_test_file`` with "targets"
+
+    Returns:
+        {
+            "targets": [{"name", "group", "runs", "passed", "answer_rate",
+                         "latency_p50_s", "latency_p95_s"}],
+            "groups": [{"name", "targets", ...same summary keys}],
+            "cases": {case_name: {target_name: run}}
+        }
+    """
+    targets = result.get("targets", [])
+    by_target: Dict[str, List[Dict[str, Any]]] = {target["name"]: [] for target in targets}
+    cases: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for run in result.get("runs", []):
+        if "target" not in run:
+            continue
+        by_target.setdefault(run["target"], []).append(run)
+        cases.setdefault(run.get("case", run["name"]), {})[run["target"]] = run
+
+    target_rows = []
+    for target in targets:
+        row = {"name": target["name"], "group": target.get("group")}
+        row.update(_summarize(by_target[target["name"]]))
+        target_rows.append(row)
+
+    group_rows = []
+    groups: Dict[str, List[str]] = {}
+    for target in targets:
+        if target.get("group"):
+            groups.setdefault(target["group"], []).append(target["name"])
+    for group, names in groups.items():
+        row = {"name": group, "targets": names}
+        row.update(_summarize([run for name in names for run in by_target[name]]))
+        group_rows.append(row)
+
+    return {"targets": target_rows, "groups": group_rows, "cases": cases}
+
+
+def _format_latency(value: Optional[float]) -> str:
+    return f"{value * 1000:.0f} ms" if value is not None else "-"
+
+
+def _format_cell(run: Optional[Dict[str, Any]]) -> str:
+    if run is None:
+        return "-"
+    actual = run.get("actual") or {}
+    status = "✅" if run.get("passed") else "❌"
+    outcome = actual.get("outcome") or ("error" if "error" in run else "-")
+    parts = [status, outcome]
+    if actual.get("sip_code") is not None:
+        parts.append(str(actual["sip_code"]))
+    latency = setup_latency_s(actual)
+    if latency is not None:
+        parts.append(_format_latency(latency))
+    return " ".join(parts)
+
+
+def _summary_table(rows: List[Dict[str, Any]], first_column: str) -> List[str]:
+    lines = [
+        f"| {first_column} | Passed | Answer rate | Setup p50 | Setup p95 |",
+        "|---|---|---|---|---|",
+    ]
+    for row in rows:
+        name = row["name"]
+        if row.get("group"):
+            name = f"{name} ({row['group']})"
+        elif row.get("targets"):
+            name = f"{name} ({', '.join(row['targets'])})"
+        lines.append(
+            f"| {name} | {row['passed']}/{row['runs']} | {row['answer_rate']:.1%} "
+            f"| {_format_latency(row['latency_p50_s'])} "
+            f"| {_format_latency(row['latency_p95_s'])} |"
+        )
+    return lines
+
+
+def write_comparison_markdown(results: List[Dict[str, Any]], output_path: Path) -> int:
+    """Write a Markdown comparison report for every multi-target test file.
+
+    Args:
+        results: List of test file results (files without "targets" are skipped)
+        output_path: Path where the Markdown file should be written
+
+    Returns:
+        Number of test files included in the report
+    """
+    lines = ["# voiptest target comparison", ""]
+    included = 0
+    for result in results:
+        if not result.get("targets"):
+            continue
+        included += 1
+        comparison = compare_targets(result)
+        names = [target["name"] for target in comparison["targets"]]
+
+        lines.append(f"## {result['name']}")
+        lines.append("")
+        lines.append("| Case | " + " | ".join(names) + " |")
+        lines.append("|---" * (len(names) + 1) + "|")
+        for case_name, runs in comparison["cases"].items():
+            cells = [_format_cell(runs.get(name)) for name in names]
+            lines.append(f"| {case_name} | " + " | ".join(cells) + " |")
+        lines.append("")
+
+        lines.extend(_summary_table(comparison["targets"], "Target"))
+        lines.append("")
+        if comparison["groups"]:
+            lines.extend(_summary_table(comparison["groups"], "Group"))
+            lines.append("")
+
+    Path(output_path).write_text("\n".join(lines))
+    return included
@@ -1,12 +1,15 @@
 """Test runner that loads YAML, validates, expands matrix, and executes tests."""
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import yaml
 
+from voiptest import distributed, profiling, scheduler
 from voiptest.config import VoipTestConfig
 from voiptest.engines import sipp
+from voiptest.history import HistoryStore
 
 
 def load_test_config(yaml_path: Path) -> VoipTestConfig:
@@ -23,10 +26,22 @@ def load_test_config(yaml_path: Path) -> VoipTestConfig:
         yaml.YAMLError: If YAML is malformed
         pydantic.ValidationError: If configuration is invalid
     """
-    with open(yaml_path, "r") as f:
-        data = yaml.safe_load(f)
+    with profiling.span("load_yaml", path=str(yaml_path)):
+        with open(yaml_path, "r") as f:
+            data = yaml.safe_load(f)
 
-    return VoipTestConfig(**data)
+    with profiling.span("validate_config"):
+        config = VoipTestConfig(**data)
+
+    # Resolve file references relative to the YAML file
+    base_dir = Path(yaml_path).parent
+    if config.media is not None and not Path(config.media.pcap).is_absolute():
+        config.media.pcap = str(base_dir / config.media.pcap)
+    for pool in config.pools.values():
+        if pool.csv is not None and not Path(pool.csv).is_absolute():
+            pool.csv = str(base_dir / pool.csv)
+
+    return config
 
 
 def expand_matrix(config: VoipTestConfig) -> List[VoipTestConfig]:
@@ -56,11 +71,37 @@ def expand_matrix(config: VoipTestConfig) -> List[VoipTestConfig]:
     return expanded
 
 
-def run_single_test(config: VoipTestConfig) -> Dict[str, Any]:
+def expand_targets(config: VoipTestConfig) -> List[VoipTestConfig]:
+    """Expand a test configuration with a targets list into one case per target.
+
+    Args:
+        config: Test configuration, possibly with targets
+
+    Returns:
+        List of test configurations, each with a single target (or the
+        config itself if it has one target already)
+    """
+    if not config.targets:
+        return [config]
+
+    expanded = []
+    for target in config.targets:
+        config_dict = config.model_dump(by_alias=True)
+        config_dict["target"] = target.model_dump()
+        config_dict["targets"] = []
+        config_dict["name"] = f"{config.name} [{target.label}]"
+
+        expanded.append(VoipTestConfig(**config_dict))
+
+    return expanded
+
+
+def run_single_test(config: VoipTestConfig, capture_dir: Optional[Path] = None) -> Dict[str, Any]:
     """Run a single test case using the appropriate engine.
 
     Args:
         config: Test configuration for a single test case
+        capture_dir: Directory for per-case pcap captures (disabled if None)
 
     Returns:
         Dictionary with test result:
@@ -74,8 +115,11 @@ def run_single_test(config: VoipTestConfig) -> Dict[str, Any]:
     """
     try:
         # Currently only SIPp engine is supported
-        result = sipp.execute_test(config)
-        return result
+        with profiling.span("case", name=config.name):
+            if config.type == "register":
+                return sipp.execute_registration(config, capture_dir=capture_dir)
+            result = sipp.execute_test(config, capture_dir=capture_dir)
+            return result
     except Exception as e:
         return {
             "name": config.name,
@@ -86,38 +130,156 @@ def run_single_test(config: VoipTestConfig) -> Dict[str, Any]:
         }
 
 
-def run_test_file(yaml_path: Path) -> Dict[str, Any]:
+def run_test_file(
+    yaml_path: Path,
+    capture_dir: Optional[Path] = None,
+    history: Optional[HistoryStore] = None,
+    workers: Optional[List[str]] = None,
+    worker_slots: int = 1,
+    jobs: Union[int, str, None] = None,
+    worker_token: str = "",
+) -> Dict[str, Any]:
     """Load a YAML test file, expand matrix if present, and run all cases.
 
     Args:
         yaml_path: Path to YAML test configuration
+        capture_dir: Directory for per-case pcap captures (disabled if None;
+                     local runs only)
+        history: Results history to append each case to (disabled if None)
+        workers: Remote worker addresses ("host:port"); cases run locally if None
+        worker_slots: Concurrent cases per remote worker
+        worker_token: Shared token the remote workers require
+        jobs: Local concurrent cases per target (local runs only): a number, "auto" for
+              adaptive concurrency, or None to run them one at a time
 
     Returns:
         Dictionary with aggregated results:
         {
             "name": str,
             "passed": bool,
-            "runs": List[Dict]
+            "runs": List[Dict],
+            "workers": Dict[str, Dict],   # per-worker metrics (remote runs only)
+            "concurrency": Dict[str, Any]  # scheduler stats (local runs with jobs)
         }
     """
     # Load and validate configuration
     config = load_test_config(yaml_path)
 
-    # Expand matrix if present
-    test_cases = expand_matrix(config)
+    # Expand matrix and targets if present
+    test_cases = []
+    case_names = []
+    with profiling.span("expand_matrix"):
+        for case in expand_matrix(config):
+            for target_case in expand_targets(case):
+                test_cases.append(target_case)
+                case_names.append(case.name)
 
     # Run all test cases
-    runs = []
-    all_passed = True
+    worker_metrics = None
+    concurrency = None
+    if workers:
+        runs, worker_metrics = distributed.run_cases(
+            test_cases, workers, worker_slots, token=worker_token
+        )
+    else:
+        runs, concurrency = _run_cases(test_cases, capture_dir, jobs)
 
-    for test_config in test_cases:
-        result = run_single_test(test_config)
-        runs.append(result)
-        if not result["passed"]:
-            all_passed = False
+    # Partition results by target for the comparison report
+    if config.targets:
+        for test_config, case_name, run in zip(test_cases, case_names, runs):
+            run["case"] = case_name
+            run["target"] = test_config.target.label
+            run["group"] = test_config.target.group
 
-    return {
+    all_passed = all(result["passed"] for result in runs)
+
+    if history is not None:
+        with profiling.span("history_write"):
+            history.record_runs(
+                config.name, runs, engine="sipp", engine_version=sipp.get_sipp_version()
+            )
+
+    file_result = {
         "name": config.name,
         "passed": all_passed,
         "runs": runs,
     }
+    if config.targets:
+        file_result["targets"] = [
+            {"name": target.label, "group": target.group} for target in config.targets
+        ]
+    if worker_metrics is not None:
+        file_result["workers"] = worker_metrics
+    if concurrency is not None:
+        file_result["concurrency"] = concurrency
+    return file_result
+
+
+def _run_cases(
+    cases: List[VoipTestConfig],
+    capture_dir: Optional[Path],
+    jobs: Union[int, str, None] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """Run cases locally, targets concurrently.
+
+    Cases for different targets share no engine state (every SIPp instance
+    gets its own ports and working directory), so fanning out across
+    targets puts the same traffic on all of them at the same time. Without
+    ``jobs`` each target's cases run in order; with ``jobs`` each target
+    gets its own scheduler, sharing the host's concurrency limit.
+
+    Returns:
+        Tuple of (results in case order, concurrency stats or None):
+        {"mode", "requested", "limits", "targets": {label: scheduler stats}}
+    """
+    partitions: Dict[str, List[int]] = {}
+    for index, case in enumerate(cases):
+        partitions.setdefault(case.target.label, []).append(index)
+
+    def run_case(case: VoipTestConfig) -> Dict[str, Any]:
+        return run_single_test(case, capture_dir=capture_dir)
+
+    if jobs is None and len(partitions) <= 1:
+        return [run_case(case) for case in cases], None
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(cases)
+    target_stats: Dict[str, Dict[str, Any]] = {}
+
+    limits = None
+    ceiling = 1
+    if jobs is not None:
+        limits = scheduler.discover_limits()
+        ceiling = max(limits["max_jobs"] // len(partitions), 1)
+
+    def run_partition(label: str) -> None:
+        indices = partitions[label]
+        if limits is None:
+            for index in indices:
+                results[index] = run_case(cases[index])
+            return
+
+        if jobs == "auto":
+            controller = scheduler.AimdController(initial=1, minimum=1, maximum=ceiling)
+        else:
+            fixed = min(int(jobs), ceiling)
+            controller = scheduler.AimdController(initial=fixed, minimum=fixed, maximum=fixed)
+        partition_results, stats = scheduler.AdaptiveScheduler(controller).run(
+            [cases[index] for index in indices], run_case
+        )
+        for index, result in zip(indices, partition_results):
+            results[index] = result
+        target_stats[label] = stats
+
+    with ThreadPoolExecutor(max_workers=len(partitions)) as executor:
+        # list() re-raises anything a partition thread did not handle
+        list(executor.map(run_partition, partitions))
+
+    concurrency = None
+    if limits is not None:
+        concurrency = {
+            "mode": "auto" if jobs == "auto" else "fixed",
+            "requested": jobs,
+            "limits": limits,
+            "targets": {label: target_stats[label] for label in partitions},
+        }
+    return [result for result in results if result is not None], concurrency
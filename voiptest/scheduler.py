@@ -0,0 +1,262 @@
+"""Adaptive concurrency for local test execution (``--jobs``).
+
+The ceiling comes from what the runner host can sustain: open file
+descriptors, CPUs and the size of the ephemeral port range, each divided by
+what one SIPp case uses. These are static ceilings, not measurements of what
+is currently free. Below that ceiling an AIMD controller follows the target's health,
+much like TCP congestion control:
+
+- slow start: +1 per clean result until the first congestion signal
+- congestion avoidance: +1 per window of clean results
+- on congestion (overload responses, timeouts or setup latency well
+  above the best seen so far): halve, at most once per window
+
+With a fixed ``--jobs N`` the controller is pinned to N and only reports.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from voiptest.history import setup_latency_s
+
+# Resources one case holds while running: SIPp process pipes, log files,
+# signalling and media sockets, plus the RTP receiver and capture process
+FDS_PER_CASE = 16
+PORTS_PER_CASE = 6
+CASES_PER_CPU = 4
+
+# Final responses that mean the target is shedding load
+OVERLOAD_SIP_CODES = (408, 503)
+
+# Setup latency above this multiple of the best seen counts as congestion
+LATENCY_FACTOR = 2.0
+MIN_LATENCY_SAMPLES = 3
+
+
+def _port_range() -> Optional[Tuple[int, int]]:
+    try:
+        with open("/proc/sys/net/ipv4/ip_local_port_range") as f:
+            low, high = (int(value) for value in f.read().split())
+        return low, high
+    except (OSError, ValueError):
+        return None
+
+
+def discover_limits() -> Dict[str, Any]:
+    """Estimate how many cases this host can run at once.
+
+    Returns:
+        {
+            "cpus": int,
+            "nofile": int | None,     # soft RLIMIT_NOFILE
+            "port_range": int | None, # ephemeral port range size, not free ports
+            "max_jobs": int,          # smallest of the per-resource limits
+            "bound": str              # resource that set max_jobs
+        }
+    """
+    cpus = os.cpu_count() or 1
+    candidates = {"cpus": cpus * CASES_PER_CPU}
+
+    nofile = None
+    try:
+        import resource
+
+        soft, _hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft != resource.RLIM_INFINITY:
+            nofile = soft
+            # Keep headroom for the runner's own files and sockets
+            candidates["nofile"] = (soft - 64) // FDS_PER_CASE
+    except (ImportError, OSError, ValueError):
+        pass
+
+    range_size = None
+    port_range = _port_range()
+    if port_range is not None:
+        range_size = port_range[1] - port_range[0] + 1
+        candidates["port_range"] = range_size // PORTS_PER_CASE
+
+    bound = min(candidates, key=lambda name: candidates[name])
+    return {
+        "cpus": cpus,
+        "nofile": nofile,
+        "port_range": range_size,
+        "max_jobs": max(candidates[bound], 1),
+        "bound": bound,
+    }
+
+
+def congestion_signal(run: Dict[str, Any]) -> Optional[str]:
+    """Classify a result as a target overload signal.
+
+    Responses and timeouts that the case itself expects (e.g. a negative
+    test for 503) are not counted.
+
+    Args:
+        run: Run result dictionary from the runner
+
+    Returns:
+        "overload", "timeout" or None
+    """
+    expect = (run.get("config") or {}).get("expect") or {}
+    actual = run.get("actual") or {}
+
+    sip_code = actual.get("sip_code")
+    if sip_code in OVERLOAD_SIP_CODES and expect.get("final_sip_code") != sip_code:
+        return "overload"
+
+    error = (run.get("error") or "").lower()
+    timed_out = "timeout" in error or "timed out" in error
+    if timed_out and expect.get("outcome") != "no_answer":
+        return "timeout"
+
+    return None
+
+
+class AimdController:
+    """Additive-increase/multiplicative-decrease concurrency limit.
+
+    Not thread-safe; the scheduler serializes access.
+    """
+
+    def __init__(self, initial: int = 1, minimum: int = 1, maximum: int = 1) -> None:
+        self.minimum = max(minimum, 1)
+        self.maximum = max(maximum, self.minimum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.slow_start = True
+        self.backoffs = 0
+        self.best_latency_s: Optional[float] = None
+        self.latency_samples = 0
+        self.signals: Dict[str, int] = {"overload": 0, "timeout": 0, "latency": 0}
+        # Results from cases started before the last decrease describe the
+        # old load level and must not trigger another one
+        self._started = 0
+        self._recovery_until = 0
+
+    @property
+    def fixed(self) -> bool:
+        return self.minimum == self.maximum
+
+    @property
+    def window(self) -> int:
+        """Current concurrency limit as a whole number of cases."""
+        return int(self.limit)
+
+    def on_start(self) -> int:
+        """Register a case start and return its sequence number."""
+        self._started += 1
+        return self._started
+
+    def on_result(self, sequence: int, run: Dict[str, Any]) -> None:
+        """Adjust the limit for one finished case.
+
+        Args:
+            sequence: Value returned by on_start for this case
+            run: Run result dictionary
+        """
+        signal = congestion_signal(run)
+
+        latency = setup_latency_s(run.get("actual") or {})
+        if signal is None and latency is not None:
+            if (
+                self.latency_samples >= MIN_LATENCY_SAMPLES
+                and self.best_latency_s
+                and latency > self.best_latency_s * LATENCY_FACTOR
+            ):
+                signal = "latency"
+            self.latency_samples += 1
+            if self.best_latency_s is None or latency < self.best_latency_s:
+                self.best_latency_s = latency
+
+        if signal is not None:
+            self.signals[signal] += 1
+            if sequence > self._recovery_until:
+                self.limit = max(self.limit / 2.0, float(self.minimum))
+                self.slow_start = False
+                self.backoffs += 1
+                self._recovery_until = self._started
+            return
+
+        if self.slow_start:
+            self.limit = min(self.limit + 1.0, float(self.maximum))
+        else:
+            self.limit = min(self.limit + 1.0 / self.window, float(self.maximum))
+
+
+class AdaptiveScheduler:
+    """Run cases concurrently under an AIMD-controlled limit."""
+
+    def __init__(self, controller: AimdController) -> None:
+        self.controller = controller
+
+    def run(
+        self,
+        cases: List[Any],
+        run_case: Callable[[Any], Dict[str, Any]],
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Run every case, keeping at most ``controller.window`` in flight.
+
+        Args:
+            cases: Cases to run, started in order
+            run_case: Function running one case and returning its result
+
+        Returns:
+            Tuple of (results in case order, stats):
+            stats = {"settled", "peak", "backoffs", "signals", "best_latency_s",
+                     "elapsed_s", "history": [(elapsed_s, limit)]}
+        """
+        controller = self.controller
+        condition = threading.Condition()
+        results: List[Optional[Dict[str, Any]]] = [None] * len(cases)
+        in_flight = [0]
+        peak = [0]
+        started_at = time.monotonic()
+        history = [(0.0, controller.window)]
+
+        def worker(index: int, sequence: int) -> None:
+            try:
+                result = run_case(cases[index])
+            except Exception as e:
+                # Keep the slot accounting intact; the case is reported as failed
+                result = {
+                    "name": getattr(cases[index], "name", str(index)),
+                    "passed": False,
+                    "actual": {},
+                    "error": str(e),
+                }
+            with condition:
+                results[index] = result
+                in_flight[0] -= 1
+                controller.on_result(sequence, result)
+                if controller.window != history[-1][1]:
+                    history.append(
+                        (round(time.monotonic() - started_at, 3), controller.window)
+                    )
+                condition.notify_all()
+
+        threads = []
+        for index in range(len(cases)):
+            with condition:
+                while in_flight[0] >= controller.window:
+                    condition.wait()
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+                sequence = controller.on_start()
+            thread = threading.Thread(target=worker, args=(index, sequence), daemon=True)
+            thread.start()
+            threads.append(thread)
+
+        for thread in threads:
+            thread.join()
+
+        stats = {
+            "settled": controller.window,
+            "peak": peak[0],
+            "backoffs": controller.backoffs,
+            "signals": dict(controller.signals),
+            "best_latency_s": controller.best_latency_s,
+            "elapsed_s": round(time.monotonic() - started_at, 3),
+            "history": history,
+        }
+        return [result for result in results if result is not None], stats
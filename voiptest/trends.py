@@ -0,0 +1,198 @@
+"""Regression detection over the results history.
+
+For each case/target series the most recent runs are compared with a
+baseline window of the runs before them:
+
+- setup latency with a one-sided Mann-Whitney U test (recent slower),
+  using the normal approximation with tie correction
+- answer rate with a one-sided Fisher exact test (recent lower)
+
+A regression is flagged when a test is significant at ``alpha`` and, for
+latency, the median also moved by at least ``min_change_pct``.
+"""
+
+import math
+from statistics import median
+from typing import Any, Dict, List, Optional, Sequence
+
+from voiptest.history import HistoryStore
+
+# Minimum samples per window before a test is attempted
+MIN_SAMPLES = 3
+
+
+def percentile(values: Sequence[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile.
+
+    Args:
+        values: Samples in any order
+        pct: Percentile in (0, 100]
+
+    Returns:
+        The smallest sample with at least pct% of samples at or below it,
+        or None without samples
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(pct * len(ordered) / 100.0), 1)
+    return ordered[rank - 1]
+
+
+def mann_whitney_greater(recent: Sequence[float], baseline: Sequence[float]) -> float:
+    """One-sided Mann-Whitney U test that ``recent`` tends to be larger.
+
+    Args:
+        recent: Samples from the recent window
+        baseline: Samples from the baseline window
+
+    Returns:
+        p-value (normal approximation with tie and continuity correction)
+    """
+    n1, n2 = len(recent), len(baseline)
+    combined = sorted([(v, 0) for v in recent] + [(v, 1) for v in baseline])
+
+    # Average ranks over ties
+    rank_sum = 0.0
+    tie_term = 0.0
+    i = 0
+    while i < len(combined):
+        j = i
+        while j + 1 < len(combined) and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        avg_rank = (i + j) / 2.0 + 1.0
+        ties = j - i + 1
+        tie_term += ties ** 3 - ties
+        rank_sum += avg_rank * sum(1 for k in range(i, j + 1) if combined[k][1] == 0)
+        i = j + 1
+
+    u = rank_sum - n1 * (n1 + 1) / 2.0
+    n = n1 + n2
+    mean_u = n1 * n2 / 2.0
+    var_u = n1 * n2 / 12.0 * ((n + 1) - tie_term / (n * (n - 1)))
+    if var_u <= 0:
+        return 1.0
+
+    z = (u - mean_u - 0.5) / math.sqrt(var_u)
+    return 0.5 * math.erfc(z / math.sqrt(2.0))
+
+
+def fisher_less(recent_hits: int, recent_n: int, baseline_hits: int, baseline_n: int) -> float:
+    """One-sided Fisher exact test that the recent rate is lower than baseline.
+
+    Args:
+        recent_hits: Successes in the recent window
+        recent_n: Recent window size
+        baseline_hits: Successes in the baseline window
+        baseline_n: Baseline window size
+
+    Returns:
+        p-value
+    """
+    total_hits = recent_hits + baseline_hits
+    total = recent_n + baseline_n
+    denominator = math.comb(total, recent_n)
+
+    # P(X <= recent_hits) under the hypergeometric null
+    low = max(0, total_hits - baseline_n)
+    p = sum(
+        math.comb(total_hits, k) * math.comb(total - total_hits, recent_n - k)
+        for k in range(low, recent_hits + 1)
+    )
+    return min(p / denominator, 1.0)
+
+
+def analyze_series(
+    rows: List[Any],
+    recent: int,
+    alpha: float,
+    min_change_pct: float,
+) -> Optional[Dict[str, Any]]:
+    """Compare the recent window of a series with its baseline window.
+
+    Args:
+        rows: Result rows, newest first (recent window followed by baseline)
+        recent: Number of rows in the recent window
+        alpha: Significance level
+        min_change_pct: Minimum median latency increase to flag (percent)
+
+    Returns:
+        Trend dictionary, or None if either window is too small
+    """
+    recent_rows = rows[:recent]
+    baseline_rows = rows[recent:]
+    if len(recent_rows) < MIN_SAMPLES or len(baseline_rows) < MIN_SAMPLES:
+        return None
+
+    trend: Dict[str, Any] = {
+        "recent_n": len(recent_rows),
+        "baseline_n": len(baseline_rows),
+        "latency_regression": False,
+        "answer_rate_regression": False,
+    }
+
+    # Setup latency
+    recent_lat = [r["setup_latency_s"] for r in recent_rows if r["setup_latency_s"] is not None]
+    base_lat = [r["setup_latency_s"] for r in baseline_rows if r["setup_latency_s"] is not None]
+    if len(recent_lat) >= MIN_SAMPLES and len(base_lat) >= MIN_SAMPLES:
+        recent_median = median(recent_lat)
+        base_median = median(base_lat)
+        change_pct = (
+            100.0 * (recent_median - base_median) / base_median if base_median > 0 else 0.0
+        )
+        p_latency = mann_whitney_greater(recent_lat, base_lat)
+        trend.update({
+            "latency_baseline_s": round(base_median, 4),
+            "latency_recent_s": round(recent_median, 4),
+            "latency_change_pct": round(change_pct, 1),
+            "latency_p": round(p_latency, 4),
+            "latency_regression": p_latency < alpha and change_pct >= min_change_pct,
+        })
+
+    # Answer rate
+    recent_hits = sum(r["answered"] for r in recent_rows)
+    base_hits = sum(r["answered"] for r in baseline_rows)
+    p_answer = fisher_less(recent_hits, len(recent_rows), base_hits, len(baseline_rows))
+    trend.update({
+        "answer_rate_baseline": round(base_hits / len(baseline_rows), 4),
+        "answer_rate_recent": round(recent_hits / len(recent_rows), 4),
+        "answer_rate_p": round(p_answer, 4),
+        "answer_rate_regression": p_answer < alpha,
+    })
+
+    return trend
+
+
+def detect_regressions(
+    store: HistoryStore,
+    baseline: int = 20,
+    recent: int = 5,
+    alpha: float = 0.05,
+    min_change_pct: float = 10.0,
+    case_filter: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Analyze every case/target series in the history.
+
+    Args:
+        store: History store
+        baseline: Number of runs in the baseline window
+        recent: Number of most recent runs to compare against the baseline
+        alpha: Significance level
+        min_change_pct: Minimum median latency increase to flag (percent)
+        case_filter: Only analyze cases whose name contains this substring
+
+    Returns:
+        One trend dictionary per series with enough history, each with
+        "case_name", "target" and "regression" keys added
+    """
+    trends = []
+    for case_name, target in store.series_keys(case_filter):
+        rows = store.latest(case_name, target, baseline + recent)
+        trend = analyze_series(rows, recent, alpha, min_change_pct)
+        if trend is None:
+            continue
+        trend["case_name"] = case_name
+        trend["target"] = target
+        trend["regression"] = trend["latency_regression"] or trend["answer_rate_regression"]
+        trends.append(trend)
+    return trends